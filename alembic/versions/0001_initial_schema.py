@@ -0,0 +1,130 @@
+"""initial schema
+
+Схема, яку раніше створював Base.metadata.create_all у app/main.py.
+Для існуючих баз даних, створених через create_all, цю ревізію треба лише позначити:
+    alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SPACE_TYPES = ("HOME", "APARTMENT", "OFFICE", "WAREHOUSE", "OTHER")
+DEVICE_TYPES = (
+    "CAMERA", "MOTION_SENSOR", "DOOR_SENSOR", "WINDOW_SENSOR", "SMOKE_DETECTOR", "WATER_LEAK_SENSOR",
+    "TEMPERATURE_SENSOR", "HUMIDITY_SENSOR", "AIR_QUALITY_SENSOR", "OTHER",
+)
+EVENT_TYPES = (
+    "MOTION_DETECTED", "DOOR_OPENED", "WINDOW_OPENED", "SMOKE_DETECTED", "WATER_LEAK_DETECTED", "TEMPERATURE",
+    "BATTERY", "HUMIDITY", "POOR_AIR_QUALITY", "DEVICE_OFFLINE", "DEVICE_ONLINE", "OTHER",
+)
+INCIDENT_STATUSES = ("NEW", "ACKNOWLEDGED", "RESOLVED", "FALSE_ALARM")
+INCIDENT_SEVERITIES = ("LOW", "MEDIUM", "HIGH", "CRITICAL")
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("first_name", sa.String()),
+        sa.Column("last_name", sa.String()),
+        sa.Column("phone", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "spaces",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("type", sa.Enum(*SPACE_TYPES, name="spacetype")),
+        sa.Column("address", sa.String()),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_spaces_id", "spaces", ["id"])
+
+    op.create_table(
+        "hubs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("model", sa.String()),
+        sa.Column("api_key", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("last_connection", sa.DateTime(timezone=True)),
+        sa.Column("ip_address", sa.String()),
+        sa.Column("space_id", sa.Integer(), sa.ForeignKey("spaces.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_hubs_id", "hubs", ["id"])
+    op.create_index("ix_hubs_api_key", "hubs", ["api_key"], unique=True)
+
+    op.create_table(
+        "devices",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("type", sa.Enum(*DEVICE_TYPES, name="devicetype"), nullable=False),
+        sa.Column("zigbee_id", sa.String()),
+        sa.Column("location", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("battery_level", sa.Float()),
+        sa.Column("config", sa.JSON()),
+        sa.Column("last_seen", sa.DateTime(timezone=True)),
+        sa.Column("hub_id", sa.Integer(), sa.ForeignKey("hubs.id")),
+        sa.Column("space_id", sa.Integer(), sa.ForeignKey("spaces.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_devices_id", "devices", ["id"])
+    op.create_index("ix_devices_zigbee_id", "devices", ["zigbee_id"], unique=True)
+
+    op.create_table(
+        "events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("type", sa.Enum(*EVENT_TYPES, name="eventtype"), nullable=False),
+        sa.Column("data", sa.JSON()),
+        sa.Column("processed", sa.Boolean()),
+        sa.Column("device_id", sa.Integer(), sa.ForeignKey("devices.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_events_id", "events", ["id"])
+
+    op.create_table(
+        "incidents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.String()),
+        sa.Column("status", sa.Enum(*INCIDENT_STATUSES, name="incidentstatus")),
+        sa.Column("severity", sa.Enum(*INCIDENT_SEVERITIES, name="incidentseverity")),
+        sa.Column("data", sa.JSON()),
+        sa.Column("event_id", sa.Integer(), sa.ForeignKey("events.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("resolved_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_incidents_id", "incidents", ["id"])
+
+
+def downgrade():
+    op.drop_table("incidents")
+    op.drop_table("events")
+    op.drop_table("devices")
+    op.drop_table("hubs")
+    op.drop_table("spaces")
+    op.drop_table("users")
+    for name in ("incidentseverity", "incidentstatus", "eventtype", "devicetype", "spacetype"):
+        sa.Enum(name=name).drop(op.get_bind(), checkfirst=True)
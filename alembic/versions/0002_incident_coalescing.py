@@ -0,0 +1,27 @@
+"""incident coalescing columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("incidents", sa.Column("device_id", sa.Integer(), sa.ForeignKey("devices.id")))
+    op.add_column("incidents", sa.Column("rule", sa.String()))
+    op.add_column("incidents", sa.Column("hit_count", sa.Integer(), server_default="1", nullable=False))
+    op.add_column("incidents", sa.Column("last_seen_at", sa.DateTime(timezone=True)))
+
+
+def downgrade():
+    op.drop_column("incidents", "last_seen_at")
+    op.drop_column("incidents", "hit_count")
+    op.drop_column("incidents", "rule")
+    op.drop_column("incidents", "device_id")
@@ -0,0 +1,49 @@
+"""indexes for hot query paths
+
+Індекси будуються через CREATE INDEX CONCURRENTLY, тому міграцію можна
+застосовувати на робочій базі без блокування запису в таблиці.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_spaces_owner_id", "spaces", ["owner_id"], None),
+    ("ix_hubs_space_id", "hubs", ["space_id"], None),
+    ("ix_devices_hub_id", "devices", ["hub_id"], None),
+    ("ix_devices_space_id_type", "devices", ["space_id", "type"], None),
+    ("ix_events_created_at_id", "events", ["created_at", "id"], None),
+    ("ix_events_device_id_created_at_id", "events", ["device_id", "created_at", "id"], None),
+    ("ix_events_device_id_type_created_at_id", "events", ["device_id", "type", "created_at", "id"], None),
+    ("ix_events_unprocessed_id", "events", ["id"], "processed = false"),
+    ("ix_incidents_event_id", "incidents", ["event_id"], None),
+    ("ix_incidents_created_at_id", "incidents", ["created_at", "id"], None),
+    ("ix_incidents_status_created_at_id", "incidents", ["status", "created_at", "id"], None),
+    ("ix_incidents_open_device_id_rule", "incidents", ["device_id", "rule"], "status IN ('NEW', 'ACKNOWLEDGED')"),
+]
+
+
+def upgrade():
+    # CONCURRENTLY не можна виконувати всередині транзакції
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,101 @@
+"""range-partition events by created_at
+
+Таблиця events перетворюється на секціоновану за created_at (по місяцях).
+Існуюча таблиця не копіюється, а підключається як перша секція events_legacy
+(MINVALUE .. початок наступного місяця). Обмеження CHECK перевіряється заздалегідь
+без ексклюзивного блокування, тому ATTACH PARTITION не сканує таблицю.
+Первинний ключ секціонованої таблиці - (id, created_at), тому зовнішній ключ
+incidents.event_id -> events.id видаляється. Подальші секції створює
+python -m app.maintenance.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from datetime import date
+
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+EVENT_INDEXES = [
+    ("ix_events_id", "(id)"),
+    ("ix_events_created_at_id", "(created_at, id)"),
+    ("ix_events_device_id_created_at_id", "(device_id, created_at, id)"),
+    ("ix_events_device_id_type_created_at_id", "(device_id, type, created_at, id)"),
+    ("ix_events_unprocessed_id", "(id) WHERE processed = false"),
+]
+
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    bound = add_months(date.today().replace(day=1), 1)
+
+    # Унікальний індекс під майбутній первинний ключ (id, created_at) будуємо без блокування запису
+    with op.get_context().autocommit_block():
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_events_id_created_at ON events (id, created_at)")
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"ALTER TABLE events ADD CONSTRAINT events_legacy_range "
+            f"CHECK (created_at IS NOT NULL AND created_at < '{bound}') NOT VALID"
+        )
+        op.execute("ALTER TABLE events VALIDATE CONSTRAINT events_legacy_range")
+
+    op.execute("ALTER TABLE incidents DROP CONSTRAINT IF EXISTS incidents_event_id_fkey")
+    op.execute("ALTER TABLE events ALTER COLUMN created_at SET NOT NULL")
+    # ATTACH PARTITION підключає до первинного ключа батьківської таблиці лише індекс, що належить
+    # обмеженню, інакше будує новий унікальний індекс під ексклюзивним блокуванням. Обмеження
+    # на вже побудованому індексі створюється без сканування таблиці
+    op.execute("ALTER TABLE events ADD CONSTRAINT events_id_created_at_key UNIQUE USING INDEX ix_events_id_created_at")
+    op.execute("ALTER TABLE events RENAME TO events_legacy")
+    op.execute("ALTER TABLE events_legacy RENAME CONSTRAINT events_pkey TO events_legacy_pkey")
+    op.execute(
+        "ALTER TABLE events_legacy RENAME CONSTRAINT events_id_created_at_key TO events_legacy_id_created_at_key"
+    )
+    for name, _ in EVENT_INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name.replace('ix_events_', 'ix_events_legacy_')}")
+
+    op.execute("""
+        CREATE TABLE events (
+            id INTEGER NOT NULL DEFAULT nextval('events_id_seq'),
+            type eventtype NOT NULL,
+            data JSON,
+            processed BOOLEAN,
+            device_id INTEGER REFERENCES devices (id),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT events_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE events_id_seq OWNED BY events.id")
+    for name, definition in EVENT_INDEXES:
+        op.execute(f"CREATE INDEX {name} ON events {definition}")
+
+    # Індекси events_legacy з тим самим визначенням підключаються до індексів батьківської таблиці,
+    # events_legacy_id_created_at_key - до первинного ключа events_pkey
+    op.execute(f"ALTER TABLE events ATTACH PARTITION events_legacy FOR VALUES FROM (MINVALUE) TO ('{bound}')")
+    op.execute("ALTER TABLE events_legacy DROP CONSTRAINT events_legacy_range")
+
+    for offset in range(MONTHS_AHEAD + 1):
+        start = add_months(bound, offset)
+        end = add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS events_{start:%Y_%m} PARTITION OF events "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+
+
+def downgrade():
+    raise NotImplementedError("Converting partitioned events back to a plain table is not supported")
@@ -0,0 +1,56 @@
+"""telemetry rollups
+
+Агрегати показників TEMPERATURE і HUMIDITY за хвилину, годину і добу.
+Надалі їх доповнює обробник подій; тут агрегати заповнюються з уже оброблених
+подій, необроблені потраплять в агрегати під час обробки.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+METRICS = [("TEMPERATURE", "temperature"), ("HUMIDITY", "humidity")]
+BUCKETS = [("MINUTE", "minute"), ("HOUR", "hour"), ("DAY", "day")]
+
+
+def upgrade():
+    op.create_table(
+        "telemetry_rollups",
+        sa.Column("device_id", sa.Integer(), sa.ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("metric", sa.String(), primary_key=True),
+        sa.Column("bucket", sa.Enum("MINUTE", "HOUR", "DAY", name="telemetrybucket"), primary_key=True),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("sum", sa.Float(), nullable=False),
+        sa.Column("min", sa.Float(), nullable=False),
+        sa.Column("max", sa.Float(), nullable=False),
+    )
+
+    # Межі інтервалів рахуються за UTC, як і в app.core.telemetry.truncate
+    for event_type, metric in METRICS:
+        for bucket, unit in BUCKETS:
+            op.execute(f"""
+                INSERT INTO telemetry_rollups (device_id, metric, bucket, bucket_start, count, sum, min, max)
+                SELECT device_id, '{metric}', '{bucket}',
+                       date_trunc('{unit}', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                       count(*), sum(value), min(value), max(value)
+                FROM (
+                    SELECT device_id, created_at, (data ->> '{metric}')::float AS value
+                    FROM events
+                    WHERE type = '{event_type}' AND processed AND device_id IS NOT NULL
+                      AND json_typeof(data -> '{metric}') = 'number'
+                ) AS samples
+                GROUP BY 1, 4
+            """)
+
+
+def downgrade():
+    op.drop_table("telemetry_rollups")
+    sa.Enum(name="telemetrybucket").drop(op.get_bind(), checkfirst=True)
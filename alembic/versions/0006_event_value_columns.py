@@ -0,0 +1,55 @@
+"""typed value and unit columns for events
+
+Основний числовий показник подій TEMPERATURE, HUMIDITY і BATTERY зберігається
+в колонці value (і одиниця виміру в unit), щоб фільтри та агрегати не
+розбирали JSON. Колонки додаються без перезапису таблиці, існуючі рядки
+заповнюються з data окремою транзакцією для кожного пристрою, щоб не тримати
+довгу транзакцію і блокування над усією таблицею events.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Тип події, поле з показником в data і одиниця виміру за замовчуванням (як в app.schemas.event)
+EVENT_VALUES = [
+    ("TEMPERATURE", "temperature", "°C"),
+    ("HUMIDITY", "humidity", "%"),
+    ("BATTERY", "battery", "%"),
+]
+
+BACKFILL_EVENTS = """
+    UPDATE events
+    SET value = (events.data ->> fields.field)::float,
+        unit = coalesce(events.data ->> 'unit', fields.unit)
+    FROM (VALUES {values}) AS fields (event_type, field, unit)
+    WHERE events.type = fields.event_type::eventtype
+      AND json_typeof(events.data -> fields.field) = 'number'
+      AND events.value IS NULL
+""".format(values=", ".join(f"('{event_type}', '{field}', '{unit}')" for event_type, field, unit in EVENT_VALUES))
+
+
+def upgrade():
+    op.add_column("events", sa.Column("value", sa.Float()))
+    op.add_column("events", sa.Column("unit", sa.String()))
+
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            op.execute(BACKFILL_EVENTS)
+            return
+
+        conn = op.get_bind()
+        for device_id in conn.execute(sa.text("SELECT id FROM devices ORDER BY id")).scalars().all():
+            conn.execute(sa.text(BACKFILL_EVENTS + " AND events.device_id = :device_id"), {"device_id": device_id})
+
+
+def downgrade():
+    op.drop_column("events", "unit")
+    op.drop_column("events", "value")
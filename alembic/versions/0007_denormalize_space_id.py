@@ -0,0 +1,98 @@
+"""denormalize space_id onto events and incidents
+
+Списки подій та інцидентів простору фільтруються за власною колонкою space_id
+замість JOIN incidents -> events -> devices. Існуючі рядки заповнюються
+окремою транзакцією для кожного пристрою, щоб не тримати довгу транзакцію над
+усією таблицею events. Індекс на секціонованій events створюється для кожної
+секції через CREATE INDEX CONCURRENTLY і підключається до індексу батьківської таблиці.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+INCIDENT_INDEXES = [
+    ("ix_incidents_device_id", ["device_id"]),
+    ("ix_incidents_space_id_created_at_id", ["space_id", "created_at", "id"]),
+    ("ix_incidents_space_id_status_created_at_id", ["space_id", "status", "created_at", "id"]),
+]
+
+EVENTS_INDEX = "ix_events_space_id_created_at_id"
+
+BACKFILL_EVENTS = """
+    UPDATE events SET space_id = devices.space_id
+    FROM devices
+    WHERE events.device_id = devices.id AND events.space_id IS NULL
+"""
+
+
+def upgrade():
+    op.add_column("events", sa.Column("space_id", sa.Integer()))
+    op.add_column("incidents", sa.Column("space_id", sa.Integer()))
+    op.create_foreign_key(
+        "incidents_space_id_fkey", "incidents", "spaces", ["space_id"], ["id"], postgresql_not_valid=True
+    )
+    # Видалення пристрою не повинно блокуватися його інцидентами
+    op.drop_constraint("incidents_device_id_fkey", "incidents", type_="foreignkey")
+    op.create_foreign_key(
+        "incidents_device_id_fkey", "incidents", "devices", ["device_id"], ["id"],
+        ondelete="SET NULL", postgresql_not_valid=True
+    )
+
+    # Інциденти, створені до міграції 0002, ще не мають device_id
+    op.execute("""
+        UPDATE incidents SET device_id = events.device_id
+        FROM events
+        WHERE incidents.device_id IS NULL AND events.id = incidents.event_id
+    """)
+    op.execute("""
+        UPDATE incidents SET space_id = devices.space_id
+        FROM devices
+        WHERE incidents.device_id = devices.id AND incidents.space_id IS NULL
+    """)
+
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE incidents VALIDATE CONSTRAINT incidents_space_id_fkey")
+        op.execute("ALTER TABLE incidents VALIDATE CONSTRAINT incidents_device_id_fkey")
+
+        for name, columns in INCIDENT_INDEXES:
+            op.create_index(name, "incidents", columns, postgresql_concurrently=True, if_not_exists=True)
+
+        if context.is_offline_mode():
+            op.execute(BACKFILL_EVENTS)
+            op.execute(f"CREATE INDEX IF NOT EXISTS {EVENTS_INDEX} ON events (space_id, created_at, id)")
+            return
+
+        conn = op.get_bind()
+        for device_id in conn.execute(sa.text("SELECT id FROM devices ORDER BY id")).scalars().all():
+            conn.execute(sa.text(BACKFILL_EVENTS + " AND devices.id = :device_id"), {"device_id": device_id})
+
+        # Індекс лише на батьківській таблиці не блокує секції, далі будуємо його для кожної секції окремо
+        op.execute(f"CREATE INDEX IF NOT EXISTS {EVENTS_INDEX} ON ONLY events (space_id, created_at, id)")
+        partitions = conn.execute(sa.text("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'events'::regclass
+        """)).scalars().all()
+        for partition in partitions:
+            index = f"{partition}_space_id_created_at_id_idx"
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON {partition} (space_id, created_at, id)")
+            op.execute(f"ALTER INDEX {EVENTS_INDEX} ATTACH PARTITION {index}")
+
+
+def downgrade():
+    op.drop_index(EVENTS_INDEX, table_name="events", if_exists=True)
+    for name, _ in reversed(INCIDENT_INDEXES):
+        op.drop_index(name, table_name="incidents", if_exists=True)
+    op.drop_constraint("incidents_device_id_fkey", "incidents", type_="foreignkey")
+    op.create_foreign_key("incidents_device_id_fkey", "incidents", "devices", ["device_id"], ["id"])
+    op.drop_constraint("incidents_space_id_fkey", "incidents", type_="foreignkey")
+    op.drop_column("incidents", "space_id")
+    op.drop_column("events", "space_id")
@@ -0,0 +1,41 @@
+"""device and hub counter columns
+
+Колонки-лічильники spaces.device_count, spaces.hub_count і hubs.device_count
+заповнюються поточними значеннями; далі їх підтримують операції API
+(app.core.counters), а python -m app.maintenance перераховує їх на випадок розбіжностей.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+RECOUNT_SPACES = """
+    UPDATE spaces SET
+        device_count = (SELECT count(*) FROM devices WHERE devices.space_id = spaces.id),
+        hub_count = (SELECT count(*) FROM hubs WHERE hubs.space_id = spaces.id)
+"""
+
+RECOUNT_HUBS = """
+    UPDATE hubs SET device_count = (SELECT count(*) FROM devices WHERE devices.hub_id = hubs.id)
+"""
+
+
+def upgrade():
+    op.add_column("spaces", sa.Column("device_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("spaces", sa.Column("hub_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("hubs", sa.Column("device_count", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(RECOUNT_SPACES)
+    op.execute(RECOUNT_HUBS)
+
+
+def downgrade():
+    op.drop_column("hubs", "device_count")
+    op.drop_column("spaces", "hub_count")
+    op.drop_column("spaces", "device_count")
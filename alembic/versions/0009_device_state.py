@@ -0,0 +1,62 @@
+"""device_state projection
+
+Поточний стан пристроїв для дашборду. Таблиця заповнюється з останніх подій
+кожного пристрою (по одному пошуку за індексом на пристрій і тип показника),
+надалі її оновлює обробник подій.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# Типи подій з числовим показником (див. app.schemas.event.EVENT_PAYLOADS)
+READING_TYPES = [("TEMPERATURE", "temperature"), ("HUMIDITY", "humidity"), ("BATTERY", "battery")]
+
+
+def upgrade():
+    op.create_table(
+        "device_state",
+        sa.Column("device_id", sa.Integer(), sa.ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("space_id", sa.Integer(), sa.ForeignKey("spaces.id")),
+        sa.Column("last_event_type", postgresql.ENUM(name="eventtype", create_type=False)),
+        sa.Column("last_event_at", sa.DateTime(timezone=True)),
+        sa.Column("readings", postgresql.JSONB(), nullable=False, server_default="{}"),
+        sa.Column("open_incident_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_device_state_space_id", "device_state", ["space_id"])
+
+    readings = ", ".join(
+        f"""'{key}', (
+            SELECT jsonb_build_object('value', e.value, 'unit', e.unit, 'at', e.created_at)
+            FROM events e
+            WHERE e.device_id = d.id AND e.type = '{event_type}' AND e.value IS NOT NULL
+            ORDER BY e.created_at DESC LIMIT 1
+        )"""
+        for event_type, key in READING_TYPES
+    )
+    op.execute(f"""
+        INSERT INTO device_state (device_id, space_id, last_event_type, last_event_at, readings, open_incident_count)
+        SELECT d.id, d.space_id, last_event.type, last_event.created_at,
+               jsonb_strip_nulls(jsonb_build_object({readings})),
+               (SELECT count(*) FROM incidents i
+                WHERE i.device_id = d.id AND i.status IN ('NEW', 'ACKNOWLEDGED'))
+        FROM devices d
+        LEFT JOIN LATERAL (
+            SELECT e.type, e.created_at FROM events e
+            WHERE e.device_id = d.id
+            ORDER BY e.created_at DESC, e.id DESC LIMIT 1
+        ) AS last_event ON true
+    """)
+
+
+def downgrade():
+    op.drop_table("device_state")
@@ -0,0 +1,25 @@
+"""space data version marker
+
+Маркер версії даних простору для умовних GET-запитів (ETag / Last-Modified).
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("spaces", sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"))
+    op.add_column("spaces", sa.Column("modified_at", sa.DateTime(timezone=True), server_default=sa.func.now()))
+
+
+def downgrade():
+    op.drop_column("spaces", "modified_at")
+    op.drop_column("spaces", "version")
@@ -0,0 +1,24 @@
+"""user token version
+
+Версія токенів користувача: токени з іншим значенням claim "ver" не приймаються.
+Значення збільшується при деактивації користувача.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    op.drop_column("users", "token_version")
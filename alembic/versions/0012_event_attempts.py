@@ -0,0 +1,27 @@
+"""event processing attempts
+
+Лічильник невдалих спроб обробки події і час, коли подію визнано такою,
+що не може бути оброблена. Стовпці з константним значенням за замовчуванням
+додаються без перезапису секцій.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("events", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("events", sa.Column("failed_at", sa.DateTime(timezone=True)))
+
+
+def downgrade():
+    op.drop_column("events", "failed_at")
+    op.drop_column("events", "attempts")
@@ -0,0 +1,86 @@
+"""unique open incident per device rule
+
+Один відкритий інцидент на пару (device_id, rule): обробник подій об'єднує
+повторні спрацювання через INSERT ... ON CONFLICT за унікальним частковим
+індексом, тож воркери на різних вузлах не створюють дублікатів.
+Лічильники debounce переносяться з пам'яті процесу в device_state.debounce.
+
+Наявні дублікати об'єднуються в найстаріший відкритий інцидент, решта
+закриваються як RESOLVED. Унікальний індекс будується через CONCURRENTLY
+під тимчасовою назвою і замінює старий неунікальний індекс.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_incidents_open_device_id_rule"
+NEW_INDEX_NAME = "ix_incidents_open_device_id_rule_unique"
+OPEN_STATUSES = "status IN ('NEW', 'ACKNOWLEDGED')"
+
+
+def upgrade():
+    op.add_column("device_state", sa.Column("debounce", postgresql.JSONB(), nullable=False, server_default="{}"))
+
+    op.execute(f"""
+        WITH duplicates AS (
+            SELECT id, keep_id FROM (
+                SELECT id, min(id) OVER (PARTITION BY device_id, rule) AS keep_id
+                FROM incidents
+                WHERE {OPEN_STATUSES} AND device_id IS NOT NULL AND rule IS NOT NULL
+            ) AS ranked
+            WHERE id <> keep_id
+        ), resolved AS (
+            UPDATE incidents SET status = 'RESOLVED', resolved_at = now()
+            FROM duplicates
+            WHERE incidents.id = duplicates.id
+            RETURNING duplicates.keep_id, incidents.device_id, incidents.hit_count, incidents.last_seen_at
+        ), merged AS (
+            UPDATE incidents
+            SET hit_count = incidents.hit_count + totals.hit_count,
+                last_seen_at = greatest(incidents.last_seen_at, totals.last_seen_at)
+            FROM (
+                SELECT keep_id, sum(hit_count) AS hit_count, max(last_seen_at) AS last_seen_at
+                FROM resolved GROUP BY keep_id
+            ) AS totals
+            WHERE incidents.id = totals.keep_id
+            RETURNING incidents.id
+        )
+        UPDATE device_state
+        SET open_incident_count = greatest(device_state.open_incident_count - counts.resolved, 0)
+        FROM (SELECT device_id, count(*) AS resolved FROM resolved GROUP BY device_id) AS counts
+        WHERE device_state.device_id = counts.device_id
+    """)
+
+    # CONCURRENTLY не можна виконувати всередині транзакції. Невалідний індекс,
+    # що лишився після невдалої спроби, видаляється перед повторною побудовою
+    with op.get_context().autocommit_block():
+        op.drop_index(NEW_INDEX_NAME, table_name="incidents", postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            NEW_INDEX_NAME, "incidents", ["device_id", "rule"], unique=True,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text(OPEN_STATUSES),
+        )
+        op.drop_index(INDEX_NAME, table_name="incidents", postgresql_concurrently=True, if_exists=True)
+        op.execute(f"ALTER INDEX {NEW_INDEX_NAME} RENAME TO {INDEX_NAME}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER INDEX {INDEX_NAME} RENAME TO {NEW_INDEX_NAME}")
+        op.create_index(
+            INDEX_NAME, "incidents", ["device_id", "rule"],
+            postgresql_concurrently=True,
+            postgresql_where=sa.text(OPEN_STATUSES),
+        )
+        op.drop_index(NEW_INDEX_NAME, table_name="incidents", postgresql_concurrently=True)
+
+    op.drop_column("device_state", "debounce")
@@ -0,0 +1,29 @@
+"""default partition for events
+
+Секція за замовчуванням приймає події, для місяця яких ще немає секції
+(наприклад, якщо python -m app.maintenance давно не запускався), замість
+помилки запису. Обслуговування переносить такі рядки у місячні секції.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # Від'єднана секція залишається окремою таблицею, щоб не втратити рядки, які в неї потрапили
+    op.execute("ALTER TABLE events DETACH PARTITION events_default")
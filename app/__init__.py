@@ -4,5 +4,7 @@ from app.models.hub import Hub
 from app.models.device import Device
 from app.models.event import Event
 from app.models.incident import Incident
+from app.models.telemetry import TelemetryRollup
+from app.models.device_state import DeviceState
 
 # Цей імпорт потрібен для Alembic міграцій, щоб всі моделі були доступні
\ No newline at end of file
@@ -1,43 +1,134 @@
-from fastapi import Depends, HTTPException, status
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
 from jose import jwt, JWTError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import SessionLocal, ReadSessionLocal, get_async_db
 from app.models.user import User
+from app.models.space import Space
 from app.models.hub import Hub
+from app.models.device import Device
+from app.models.incident import Incident
 from app.config import settings
+from app.core.cache import TTLCache
+from app.core.versions import format_http_date, parse_http_date
+from app.core.replica import recently_wrote
+from app.core.ownership import owns_space
 from app.schemas.auth import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
-async def get_current_user(
-        token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+class UserIdentity(NamedTuple):
+    id: int
+    is_active: bool
+    token_version: int
+
+
+class HubIdentity(NamedTuple):
+    id: int
+    space_id: int
+    is_active: bool
+
+
+# Кеш api_key -> HubIdentity. Кеш локальний для процесу, тому в інших воркерах
+# змінений ключ перестає діяти не пізніше ніж через HUB_API_KEY_CACHE_TTL секунд.
+hub_api_key_cache = TTLCache(
+    maxsize=settings.HUB_API_KEY_CACHE_SIZE,
+    ttl=settings.HUB_API_KEY_CACHE_TTL
+)
+
+
+# Кеш user_id -> UserIdentity. Локальний для процесу, тому в інших воркерах зміни
+# (наприклад, деактивація) набувають чинності не пізніше ніж через USER_CACHE_TTL секунд.
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL
+)
+
+
+def invalidate_hub_api_key(api_key: str):
+    hub_api_key_cache.invalidate(api_key)
+
+
+def invalidate_user(user_id: int):
+    user_cache.invalidate(user_id)
+
+
+def get_read_db(request: Request):
+    """
+    Сесія для ендпоінтів, що лише читають дані: з репліки, якщо її налаштовано
+    і користувач нещодавно нічого не змінював, інакше - з основної бази даних.
+    """
+    session_factory = ReadSessionLocal
+    if session_factory is None or recently_wrote(request):
+        session_factory = SessionLocal
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def decode_token(token: str) -> TokenData:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-        token_data = TokenData(user_id=int(user_id))
-    except JWTError:
+        return TokenData(user_id=int(user_id), token_version=payload.get("ver"), is_active=payload.get("act"))
+    except (JWTError, ValueError):
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+
+async def get_user_from_token(db: AsyncSession, token: str) -> UserIdentity:
+    """
+    Визначає користувача за токеном. Спочатку перевіряє кеш користувачів,
+    а з JWT_TRUST_CLAIMS=True бере is_active і token_version прямо з токена.
+    Токен з token_version, що не збігається з поточним, вважається відкликаним.
+    """
+    token_data = decode_token(token)
+    if settings.JWT_TRUST_CLAIMS and token_data.token_version is not None and token_data.is_active is not None:
+        return UserIdentity(
+            id=token_data.user_id, is_active=token_data.is_active, token_version=token_data.token_version
+        )
+
+    user = user_cache.get(token_data.user_id)
     if user is None:
+        row = (await db.execute(
+            select(User.id, User.is_active, User.token_version).where(User.id == token_data.user_id)
+        )).first()
+        if row is None:
+            raise credentials_exception
+        user = UserIdentity(id=row.id, is_active=bool(row.is_active), token_version=row.token_version)
+        user_cache.set(user.id, user)
+
+    if token_data.token_version is not None and token_data.token_version != user.token_version:
         raise credentials_exception
     return user
 
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_user(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_db)
+):
+    return await get_user_from_token(db, token)
+
+
+async def get_current_active_user(current_user: UserIdentity = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -45,7 +136,7 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
 
 async def get_hub_from_api_key(
         api_key: str = Depends(api_key_header),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     if not api_key:
         raise HTTPException(
@@ -53,10 +144,131 @@ async def get_hub_from_api_key(
             detail="API key is required",
         )
 
-    hub = db.query(Hub).filter(Hub.api_key == api_key).first()
-    if not hub:
+    hub = hub_api_key_cache.get(api_key)
+    if hub is not None:
+        return hub
+
+    row = (await db.execute(select(Hub.id, Hub.space_id, Hub.is_active).where(Hub.api_key == api_key))).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key",
         )
+
+    hub = HubIdentity(id=row.id, space_id=row.space_id, is_active=row.is_active)
+    hub_api_key_cache.set(api_key, hub)
     return hub
+
+
+def require_space_owner(
+        space_id: int,
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
+):
+    """
+    Залежність для ендпоінтів з space_id у шляху: 404, якщо простір не належить
+    поточному користувачу. Перевірка виконується за кешем просторів користувача.
+    Використання: @router.get(..., dependencies=[Depends(require_space_owner)]).
+    """
+    if not owns_space(db, current_user.id, space_id):
+        raise HTTPException(status_code=404, detail="Space not found")
+
+
+def require_device_owner(
+        device_id: int,
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
+):
+    """
+    Залежність для ендпоінтів з device_id у шляху: 404, якщо пристрою немає або він
+    належить чужому простору. Вказується перед conditional_get, щоб ETag чужого простору
+    не потрапляв у відповідь.
+    """
+    space_id = db.query(Device.space_id).filter(Device.id == device_id).scalar()
+    if space_id is None or not owns_space(db, current_user.id, space_id):
+        raise HTTPException(status_code=404, detail="Device not found")
+
+
+class DataVersion(NamedTuple):
+    tag: str
+    modified_at: Optional[datetime]
+
+
+# Як знайти простір ресурсу за параметром шляху: (параметр, модель, колонка з space_id)
+VERSION_SCOPES = {
+    "space": ("space_id", Space, Space.id),
+    "device": ("device_id", Device, Device.space_id),
+    "hub": ("hub_id", Hub, Hub.space_id),
+    "incident": ("incident_id", Incident, Incident.space_id),
+}
+
+
+def load_data_version(db: Session, scope: str, path_params: dict, user_id: int) -> Optional[DataVersion]:
+    if scope == "user":
+        # Список просторів користувача: змінюється при створенні, видаленні чи зміні будь-якого з них
+        count, total, last_id, modified_at = db.execute(
+            select(
+                func.count(Space.id), func.coalesce(func.sum(Space.version), 0),
+                func.max(Space.id), func.max(Space.modified_at)
+            ).where(Space.owner_id == user_id)
+        ).one()
+        return DataVersion(f"u{user_id}-{count}-{total}-{last_id}", modified_at)
+
+    param, model, space_column = VERSION_SCOPES[scope]
+    try:
+        resource_id = int(path_params[param])
+    except (KeyError, ValueError):
+        return None
+
+    query = select(Space.id, Space.version, Space.modified_at).where(Space.owner_id == user_id)
+    if model is Space:
+        query = query.where(Space.id == resource_id)
+    else:
+        query = query.join(model, space_column == Space.id).where(model.id == resource_id)
+
+    row = db.execute(query).first()
+    if row is None:
+        return None
+    return DataVersion(f"s{row.id}-{row.version}", row.modified_at)
+
+
+def conditional_get(scope: str):
+    """
+    Залежність для умовних GET-запитів. Одним запитом читає маркер версії простору,
+    до якого належить ресурс (scope: space, device, hub, incident або user для списку
+    просторів), і повертає 304, якщо If-None-Match чи If-Modified-Since збігаються з ним.
+    Інакше додає ETag і Last-Modified до відповіді.
+    Використання: @router.get(..., dependencies=[Depends(conditional_get("space"))]).
+    """
+    def dependency(
+            request: Request,
+            response: Response,
+            db: Session = Depends(get_read_db),
+            current_user: UserIdentity = Depends(get_current_active_user)
+    ):
+        version = load_data_version(db, scope, request.path_params, current_user.id)
+        if version is None:
+            # Ресурс не знайдено або він чужий - відповідь 404 сформує сам ендпоінт
+            return
+
+        headers = {"ETag": f'W/"{version.tag}"', "Cache-Control": "private, no-cache"}
+        if version.modified_at is not None:
+            headers["Last-Modified"] = format_http_date(version.modified_at)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            not_modified = headers["ETag"] in tags or "*" in tags
+        else:
+            # If-Modified-Since має точність до секунди, тому перевіряється лише без If-None-Match
+            since = parse_http_date(request.headers.get("if-modified-since", ""))
+            not_modified = (
+                since is not None and "Last-Modified" in headers
+                and parse_http_date(headers["Last-Modified"]) <= since
+            )
+
+        if not_modified:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
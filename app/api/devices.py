@@ -1,14 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.database import get_db
-from app.models.user import User
-from app.models.space import Space
 from app.models.hub import Hub
 from app.models.device import Device, DeviceType
+from app.models.device_state import DeviceState
 from app.schemas.device import DeviceCreate, DeviceOut, DeviceUpdate
-from app.api.deps import get_current_active_user, get_hub_from_api_key
+from app.schemas.device_state import DeviceStateOut
+from app.core.device_cache import cache_device, invalidate_device
+from app.core.incident_rules import invalidate_device_rules
+from app.core.counters import update_device_counters
+from app.core.versions import bump_space_versions
+from app.core.ownership import owns_space
+from app.api.deps import (
+    get_current_active_user, UserIdentity, get_hub_from_api_key, HubIdentity, conditional_get, get_read_db,
+    require_space_owner
+)
 
 router = APIRouter()
 
@@ -18,18 +27,24 @@ router = APIRouter()
 def register_device_from_hub(
         device: DeviceCreate,
         db: Session = Depends(get_db),
-        hub: Hub = Depends(get_hub_from_api_key)
+        hub: HubIdentity = Depends(get_hub_from_api_key)
 ):
     # Перевіряємо, чи пристрій з таким Zigbee ID вже існує
     if device.zigbee_id:
         existing_device = db.query(Device).filter(Device.zigbee_id == device.zigbee_id).first()
         if existing_device:
             # Якщо пристрій вже зареєстровано, оновлюємо його дані
+            old_key = (existing_device.hub_id, existing_device.id, existing_device.zigbee_id)
             for key, value in device.dict(exclude={"zigbee_id", "hub_id", "space_id"}).items():
                 setattr(existing_device, key, value)
             db.add(existing_device)
             db.commit()
+            # Кеш скидається після коміту, інакше паралельний запит може закешувати старі дані
+            invalidate_device(*old_key)
+            bump_space_versions(db, [hub.space_id])
             db.refresh(existing_device)
+            cache_device(existing_device)
+            invalidate_device_rules(existing_device.id)
             return existing_device
 
     # Створюємо новий пристрій
@@ -43,23 +58,24 @@ def register_device_from_hub(
         space_id=hub.space_id
     )
     db.add(db_device)
+    update_device_counters(db, None, None, hub.space_id, hub.id)
     db.commit()
+    bump_space_versions(db, [hub.space_id])
     db.refresh(db_device)
+    cache_device(db_device)
     return db_device
 
 
-@router.post("/{space_id}/devices", response_model=DeviceOut, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/{space_id}/devices", response_model=DeviceOut, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(require_space_owner)]
+)
 def create_device(
         space_id: int,
         device: DeviceCreate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
-    # Перевірка, чи існує простір і чи належить він поточному користувачу
-    space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
-    if space is None:
-        raise HTTPException(status_code=404, detail="Space not found")
-
     # Перевірка, чи існує хаб
     if device.hub_id:
         hub = db.query(Hub).filter(Hub.id == device.hub_id, Hub.space_id == space_id).first()
@@ -76,25 +92,26 @@ def create_device(
         space_id=space_id
     )
     db.add(db_device)
+    update_device_counters(db, None, None, space_id, device.hub_id)
     db.commit()
+    bump_space_versions(db, [space_id])
     db.refresh(db_device)
+    cache_device(db_device)
     return db_device
 
 
-@router.get("/{space_id}/devices", response_model=List[DeviceOut])
+@router.get(
+    "/{space_id}/devices", response_model=List[DeviceOut],
+    dependencies=[Depends(require_space_owner), Depends(conditional_get("space"))]
+)
 def read_devices(
         space_id: int,
         skip: int = 0,
         limit: int = 100,
         device_type: DeviceType = None,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
-    # Перевірка, чи існує простір і чи належить він поточному користувачу
-    space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
-    if space is None:
-        raise HTTPException(status_code=404, detail="Space not found")
-
     query = db.query(Device).filter(Device.space_id == space_id)
     if device_type:
         query = query.filter(Device.type == device_type)
@@ -103,19 +120,49 @@ def read_devices(
     return devices
 
 
-@router.get("/devices/{device_id}", response_model=DeviceOut)
+@router.get(
+    "/{space_id}/state", response_model=List[DeviceStateOut],
+    dependencies=[Depends(require_space_owner), Depends(conditional_get("space"))]
+)
+def read_space_state(
+        space_id: int,
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
+):
+    """
+    Повертає поточний стан усіх пристроїв простору одним запитом до devices і device_state.
+    """
+    return db.query(
+        Device.id.label("device_id"),
+        Device.name,
+        Device.type,
+        Device.location,
+        Device.is_active,
+        Device.battery_level,
+        Device.last_seen,
+        DeviceState.last_event_type,
+        DeviceState.last_event_at,
+        DeviceState.readings,
+        func.coalesce(DeviceState.open_incident_count, 0).label("open_incident_count")
+    ).outerjoin(
+        DeviceState, DeviceState.device_id == Device.id
+    ).filter(
+        Device.space_id == space_id
+    ).order_by(Device.id).all()
+
+
+@router.get(
+    "/devices/{device_id}", response_model=DeviceOut,
+    dependencies=[Depends(conditional_get("device"))]
+)
 def read_device(
         device_id: int,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     # Знаходимо пристрій і перевіряємо, чи належить він до простору поточного користувача
-    device = db.query(Device).join(Space).filter(
-        Device.id == device_id,
-        Space.owner_id == current_user.id
-    ).first()
-
-    if device is None:
+    device = db.query(Device).filter(Device.id == device_id).first()
+    if device is None or not owns_space(db, current_user.id, device.space_id):
         raise HTTPException(status_code=404, detail="Device not found")
     return device
 
@@ -125,15 +172,11 @@ def update_device(
         device_id: int,
         device_update: DeviceUpdate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     # Знаходимо пристрій і перевіряємо, чи належить він до простору поточного користувача
-    device = db.query(Device).join(Space).filter(
-        Device.id == device_id,
-        Space.owner_id == current_user.id
-    ).first()
-
-    if device is None:
+    device = db.query(Device).filter(Device.id == device_id).first()
+    if device is None or not owns_space(db, current_user.id, device.space_id):
         raise HTTPException(status_code=404, detail="Device not found")
 
     # Перевірка, чи новий хаб належить до того ж простору
@@ -142,11 +185,19 @@ def update_device(
         if hub is None:
             raise HTTPException(status_code=400, detail="Hub not found in this space")
 
+    old_key = (device.hub_id, device.id, device.zigbee_id)
+    old_hub_id = device.hub_id
     for key, value in device_update.dict(exclude_unset=True).items():
         setattr(device, key, value)
 
     db.add(device)
+    update_device_counters(db, device.space_id, old_hub_id, device.space_id, device.hub_id)
+    space_id = device.space_id
     db.commit()
+    # Кеш скидається після коміту, інакше паралельний запит може закешувати старі дані
+    invalidate_device(*old_key)
+    invalidate_device_rules(device_id)
+    bump_space_versions(db, [space_id])
     db.refresh(device)
     return device
 
@@ -155,18 +206,20 @@ def update_device(
 def delete_device(
         device_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     # Знаходимо пристрій і перевіряємо, чи належить він до простору поточного користувача
-    device = db.query(Device).join(Space).filter(
-        Device.id == device_id,
-        Space.owner_id == current_user.id
-    ).first()
-
-    if device is None:
+    device = db.query(Device).filter(Device.id == device_id).first()
+    if device is None or not owns_space(db, current_user.id, device.space_id):
         raise HTTPException(status_code=404, detail="Device not found")
 
+    old_key = (device.hub_id, device.id, device.zigbee_id)
+    space_id = device.space_id
+    update_device_counters(db, device.space_id, device.hub_id, None, None)
     db.delete(device)
     db.commit()
+    invalidate_device(*old_key)
+    invalidate_device_rules(device_id)
+    bump_space_versions(db, [space_id])
     return None
 
@@ -1,39 +1,69 @@
 import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Body, Depends, HTTPException, status, BackgroundTasks, Response
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, List
 
-from app.database import get_db
-from app.models.user import User
-from app.models.space import Space
-from app.models.hub import Hub
+from app.database import get_async_db
 from app.models.device import Device
 from app.models.event import Event, EventType
-from app.schemas.event import EventCreate, EventOut
-from app.core.event_processor import process_event
-from app.api.deps import get_current_active_user, get_hub_from_api_key
+from app.config import settings
+from app.schemas.event import EventCreate, EventOut, EventBatchItemResult
+from app.core.event_processor import process_events
+from app.core.pagination import paginate
+from app.core.event_writer import event_write_buffer, event_row, write_events
+from app.core.device_cache import resolve_device, get_cached_device, cache_device
+from app.api.deps import (
+    get_current_active_user, UserIdentity, get_hub_from_api_key, HubIdentity, conditional_get, get_read_db,
+    require_space_owner, require_device_owner
+)
 
 router = APIRouter()
 
 
-@router.get("/{space_id}/events", response_model=List[EventOut])
+def schedule_event_processing(background_tasks: BackgroundTasks, event_ids: List[int]):
+    # В режимі "worker" події забирає окремий процес app.worker з таблиці events
+    if settings.EVENT_PROCESSING_MODE == "background":
+        background_tasks.add_task(process_events, event_ids)
+
+
+def validation_error_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'event'}: {error['msg']}" for error in exc.errors()
+    )
+
+
+def filter_created_at(query, since: datetime.datetime = None, until: datetime.datetime = None):
+    # Обмеження за created_at дозволяє PostgreSQL відкинути зайві секції таблиці events
+    if since:
+        query = query.filter(Event.created_at >= since)
+    if until:
+        query = query.filter(Event.created_at < until)
+    return query
+
+
+@router.get(
+    "/{space_id}/events", response_model=List[EventOut],
+    dependencies=[Depends(require_space_owner), Depends(conditional_get("space"))]
+)
 def read_events(
         space_id: int,
         skip: int = 0,
         limit: int = 100,
         event_type: EventType = None,
         device_id: int = None,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        since: datetime.datetime = None,
+        until: datetime.datetime = None,
+        after: str = None,
+        response: Response = None,
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
-    # Перевірка, чи існує простір і чи належить він поточному користувачу
-    space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
-    if space is None:
-        raise HTTPException(status_code=404, detail="Space not found")
-
     # Формування запиту для подій
-    query = db.query(Event).join(Device).filter(Device.space_id == space_id)
+    query = db.query(Event).filter(Event.space_id == space_id)
 
     if event_type:
         query = query.filter(Event.type == event_type)
@@ -41,85 +71,151 @@ def read_events(
     if device_id:
         query = query.filter(Event.device_id == device_id)
 
-    # Сортування за часом створення (найновіші спочатку)
-    query = query.order_by(Event.created_at.desc())
+    query = filter_created_at(query, since, until)
 
-    events = query.offset(skip).limit(limit).all()
-    return events
+    # Сортування за часом створення (найновіші спочатку), курсор наступної сторінки - в X-Next-Cursor
+    return paginate(query, Event, skip, limit, after, response)
 
 
-@router.get("/devices/{device_id}/events", response_model=List[EventOut])
+@router.get(
+    "/devices/{device_id}/events", response_model=List[EventOut],
+    dependencies=[Depends(require_device_owner), Depends(conditional_get("device"))]
+)
 def read_events(
         device_id: int,
         skip: int = 0,
         limit: int = 100,
         event_type: EventType = None,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        since: datetime.datetime = None,
+        until: datetime.datetime = None,
+        after: str = None,
+        response: Response = None,
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
-    device = db.query(Device).filter(Device.id == device_id).first()
-    if device is None:
-        raise HTTPException(status_code=404, detail="Device not found")
-
     # Формування запиту для подій
-    query = db.query(Event).join(Device).filter(Device.id == device_id)
+    query = db.query(Event).filter(Event.device_id == device_id)
 
     if event_type:
         query = query.filter(Event.type == event_type)
 
-    # Сортування за часом створення (найновіші спочатку)
-    query = query.order_by(Event.created_at.desc())
+    query = filter_created_at(query, since, until)
 
-    events = query.offset(skip).limit(limit).all()
-    print(events)
-    return events
+    # Сортування за часом створення (найновіші спочатку), курсор наступної сторінки - в X-Next-Cursor
+    return paginate(query, Event, skip, limit, after, response)
 
 
 @router.post("/hub/events", response_model=EventOut)
 async def create_event_from_hub(
         event: EventCreate,
         background_tasks: BackgroundTasks,
-        db: Session = Depends(get_db),
-        hub: Hub = Depends(get_hub_from_api_key)
+        db: AsyncSession = Depends(get_async_db),
+        hub: HubIdentity = Depends(get_hub_from_api_key)
 ):
-    # Перевірка, чи існує пристрій у системі
-    device = db.query(Device).filter(
-        Device.id == event.device_id,
-        Device.hub_id == hub.id
-    ).first()
-
+    # Пошук пристрою за ID, а потім за Zigbee ID (через кеш пристроїв).
+    # run_sync виконує синхронний код з асинхронним драйвером, не блокуючи цикл подій
+    device = await db.run_sync(resolve_device, hub.id, event.device_id, event.zigbee_id)
     if device is None:
-        # Перевірка, чи можна знайти пристрій за Zigbee ID
-        if event.zigbee_id:
-            device = db.query(Device).filter(
-                Device.zigbee_id == event.zigbee_id,
-                Device.hub_id == hub.id
-            ).first()
+        raise HTTPException(status_code=404, detail="Device not found")
 
-            if device is None:
-                raise HTTPException(status_code=404, detail="Device not found")
+    row = event_row(event.type, event.data, device.id, device.space_id)
+    if event_write_buffer.running:
+        # У режимі групового коміту подія записується разом з іншими одним INSERT,
+        # а відповідь повертається лише після коміту транзакції
+        db_event = await event_write_buffer.submit(row)
+    else:
+        # Створення події і оновлення заряду батареї в одній транзакції
+        db_event = (await db.run_sync(write_events, [row]))[0]
+
+    # Запуск обробки події у фоновому режимі
+    schedule_event_processing(background_tasks, [db_event.id])
+
+    return db_event
+
+
+@router.post("/hub/events/batch", response_model=List[EventBatchItemResult])
+async def create_events_batch_from_hub(
+        background_tasks: BackgroundTasks,
+        items: List[Any] = Body(..., description="Список подій у форматі EventCreate"),
+        db: AsyncSession = Depends(get_async_db),
+        hub: HubIdentity = Depends(get_hub_from_api_key)
+):
+    if len(items) > settings.EVENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds {settings.EVENT_BATCH_MAX_SIZE} events",
+        )
+
+    results = [EventBatchItemResult(index=index) for index in range(len(items))]
+
+    # Кожна подія перевіряється окремо: некоректна подія отримує помилку в своєму результаті,
+    # а решта пакета записується
+    events = {}
+    for index, item in enumerate(items):
+        try:
+            events[index] = EventCreate.model_validate(item)
+        except ValidationError as exc:
+            results[index].error = validation_error_message(exc)
+    if not events:
+        return results
+
+    # Спочатку шукаємо пристрої в кеші, решту знаходимо одним запитом (за ID або за Zigbee ID)
+    resolved = {}
+    device_ids = set()
+    zigbee_ids = set()
+    for index, event in events.items():
+        identity = get_cached_device(hub.id, event.device_id, event.zigbee_id)
+        if identity is not None:
+            resolved[index] = identity
+            continue
+        if event.device_id is not None:
+            device_ids.add(event.device_id)
+        if event.zigbee_id:
+            zigbee_ids.add(event.zigbee_id)
+
+    by_id = {}
+    by_zigbee_id = {}
+    if device_ids or zigbee_ids:
+        devices = (await db.execute(
+            select(Device.id, Device.hub_id, Device.space_id, Device.zigbee_id).where(
+                Device.hub_id == hub.id,
+                or_(Device.id.in_(device_ids), Device.zigbee_id.in_(zigbee_ids))
+            )
+        )).all()
+        for device in devices:
+            identity = cache_device(device)
+            by_id[identity.id] = identity
+            if identity.zigbee_id:
+                by_zigbee_id[identity.zigbee_id] = identity
+
+    event_rows = []
+    event_indexes = []
+    for index, event in events.items():
+        if index in resolved:
+            identity = resolved[index]
+        elif event.device_id in by_id:
+            identity = by_id[event.device_id]
         else:
-            raise HTTPException(status_code=404, detail="Device not found")
+            identity = by_zigbee_id.get(event.zigbee_id)
 
-    if(event.data.get('battery', None)):
-        device.battery_level = event.data.get('battery')
-        device.last_seen = datetime.datetime.now()
-        db.add(device)
-        db.commit()
-        db.refresh(device)
+        if identity is None:
+            results[index].error = "Device not found"
+            continue
 
+        results[index].device_id = identity.id
+        event_rows.append(event_row(event.type, event.data, identity.id, identity.space_id))
+        event_indexes.append(index)
 
-    # Створення події в базі даних
-    db_event = Event(
-        type=event.type,
-        data=event.data,
-        device_id=device.id
-    )
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    if not event_rows:
+        return results
 
-    # Запуск обробки події у фоновому режимі
-    background_tasks.add_task(process_event, db_event.id)
+    # Вставляємо всі події одним запитом і в одній транзакції
+    event_ids = [db_event.id for db_event in await db.run_sync(write_events, event_rows)]
 
-    return db_event
+    for index, event_id in zip(event_indexes, event_ids):
+        results[index].event_id = event_id
+
+    # Запуск обробки всього пакета подій однією фоновою задачею
+    schedule_event_processing(background_tasks, event_ids)
+
+    return results
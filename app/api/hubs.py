@@ -1,32 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
-from app.database import get_db
-from app.models.device import Device
-from app.models.user import User
+from app.config import settings
+from app.database import get_db, get_async_db
 from app.models.hub import Hub
-from app.models.space import Space
 from app.schemas.hub import HubCreate, HubOut, HubUpdate
 from app.core.security import generate_api_key
-from app.api.deps import get_current_active_user, get_hub_from_api_key
+from app.core.counters import fill_hub_counts, update_hub_counters
+from app.core.versions import bump_space_versions
+from app.core.ownership import owns_space
+from app.api.deps import (
+    get_current_active_user, UserIdentity, get_hub_from_api_key, api_key_header, HubIdentity,
+    invalidate_hub_api_key, conditional_get, get_read_db, require_space_owner
+)
 
 router = APIRouter()
 
 
-@router.post("/{space_id}/hubs", response_model=HubOut, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/{space_id}/hubs", response_model=HubOut, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(require_space_owner)]
+)
 def create_hub(
         space_id: int,
         hub: HubCreate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
-    # Перевірка, чи існує простір і чи належить він поточному користувачу
-    space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
-    if space is None:
-        raise HTTPException(status_code=404, detail="Space not found")
-
     # Генерація API-ключа для хаба
     api_key = generate_api_key()
 
@@ -37,46 +41,44 @@ def create_hub(
         space_id=space_id
     )
     db.add(db_hub)
+    update_hub_counters(db, space_id, 1)
     db.commit()
+    bump_space_versions(db, [space_id])
     db.refresh(db_hub)
     return db_hub
 
 
-@router.get("/{space_id}/hubs", response_model=List[HubOut])
+@router.get(
+    "/{space_id}/hubs", response_model=List[HubOut],
+    dependencies=[Depends(require_space_owner), Depends(conditional_get("space"))]
+)
 def read_hubs(
         space_id: int,
         skip: int = 0,
         limit: int = 100,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
-    # Перевірка, чи існує простір і чи належить він поточному користувачу
-    space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
-    if space is None:
-        raise HTTPException(status_code=404, detail="Space not found")
-
     hubs = db.query(Hub).filter(Hub.space_id == space_id).offset(skip).limit(limit).all()
 
-    for hub in hubs:
-        hub.device_count = db.query(Device).filter(Device.hub_id == hub.id).count()
+    # Кількість пристроїв для всієї сторінки хабів - одним запитом
+    return fill_hub_counts(db, hubs)
 
-    return hubs
 
-
-@router.get("/hubs/{hub_id}", response_model=HubOut)
+@router.get(
+    "/hubs/{hub_id}", response_model=HubOut,
+    dependencies=[Depends(conditional_get("hub"))]
+)
 def read_hub(
         hub_id: int,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     # Знаходимо хаб і перевіряємо, чи належить він до простору поточного користувача
-    hub = db.query(Hub).join(Space).filter(
-        Hub.id == hub_id,
-        Space.owner_id == current_user.id
-    ).first()
-
-    if hub is None:
+    hub = db.query(Hub).filter(Hub.id == hub_id).first()
+    if hub is None or not owns_space(db, current_user.id, hub.space_id):
         raise HTTPException(status_code=404, detail="Hub not found")
+    fill_hub_counts(db, [hub])
     return hub
 
 
@@ -85,23 +87,23 @@ def update_hub(
         hub_id: int,
         hub_update: HubUpdate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     # Знаходимо хаб і перевіряємо, чи належить він до простору поточного користувача
-    hub = db.query(Hub).join(Space).filter(
-        Hub.id == hub_id,
-        Space.owner_id == current_user.id
-    ).first()
-
-    if hub is None:
+    hub = db.query(Hub).filter(Hub.id == hub_id).first()
+    if hub is None or not owns_space(db, current_user.id, hub.space_id):
         raise HTTPException(status_code=404, detail="Hub not found")
 
     for key, value in hub_update.dict(exclude_unset=True).items():
         setattr(hub, key, value)
 
     db.add(hub)
+    space_id = hub.space_id
     db.commit()
+    bump_space_versions(db, [space_id])
     db.refresh(hub)
+    invalidate_hub_api_key(hub.api_key)
+    fill_hub_counts(db, [hub])
     return hub
 
 
@@ -109,35 +111,54 @@ def update_hub(
 def regenerate_api_key(
         hub_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     # Знаходимо хаб і перевіряємо, чи належить він до простору поточного користувача
-    hub = db.query(Hub).join(Space).filter(
-        Hub.id == hub_id,
-        Space.owner_id == current_user.id
-    ).first()
-
-    if hub is None:
+    hub = db.query(Hub).filter(Hub.id == hub_id).first()
+    if hub is None or not owns_space(db, current_user.id, hub.space_id):
         raise HTTPException(status_code=404, detail="Hub not found")
 
-    # Генерація нового API-ключа
+    # Генерація нового API-ключа; старий ключ одразу прибираємо з кешу
+    old_api_key = hub.api_key
     hub.api_key = generate_api_key()
 
     db.add(hub)
+    space_id = hub.space_id
     db.commit()
+    invalidate_hub_api_key(old_api_key)
+    bump_space_versions(db, [space_id])
     db.refresh(hub)
+    fill_hub_counts(db, [hub])
     return hub
 
 
 @router.post("/hub/ping")
-def hub_ping(
-        db: Session = Depends(get_db),
-        hub: Hub = Depends(get_hub_from_api_key)
+async def hub_ping(
+        db: AsyncSession = Depends(get_async_db),
+        api_key: str = Depends(api_key_header),
+        hub: HubIdentity = Depends(get_hub_from_api_key)
 ):
-    # Оновлення часу останнього з'єднання хаба
-    hub.last_connection = datetime.utcnow()
-    hub.is_active = True
-    db.add(hub)
-    db.commit()
-    db.refresh(hub)
+    # Оновлення часу останнього з'єднання хаба одним UPDATE без окремого SELECT;
+    # попередні значення повертаються з підзапиту, що читає рядок до оновлення
+    previous = select(Hub.id, Hub.last_connection, Hub.is_active).where(Hub.id == hub.id).with_for_update().subquery()
+    result = (await db.execute(
+        update(Hub).where(Hub.id == previous.c.id).values(
+            last_connection=datetime.utcnow(), is_active=True
+        ).returning(previous.c.last_connection, previous.c.is_active)
+    )).first()
+    await db.commit()
+    if result is None:
+        return {"status": "ok"}
+
+    last_connection, was_active = result
+    if last_connection is not None and last_connection.tzinfo is None:
+        last_connection = last_connection.replace(tzinfo=timezone.utc)
+    # last_connection та is_active повертаються в HubOut за умовними GET-запитами, тому версія простору
+    # змінюється, коли хаб знову активний або збережений час застарів більш ніж на половину
+    # HUB_ONLINE_TIMEOUT. Так клієнт бачить статус онлайн, а частота оновлень версії обмежена
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.HUB_ONLINE_TIMEOUT / 2)
+    if not was_active or last_connection is None or last_connection < stale_before:
+        await db.run_sync(bump_space_versions, [hub.space_id])
+    if not hub.is_active or not was_active:
+        invalidate_hub_api_key(api_key)
     return {"status": "ok"}
@@ -1,72 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 
 from app.database import get_db
-from app.models.device import Device
-from app.models.event import Event
-from app.models.user import User
-from app.models.space import Space
-from app.models.incident import Incident, IncidentStatus
+from app.models.incident import Incident, IncidentStatus, OPEN_STATUSES
 from app.schemas.incident import IncidentOut, IncidentStatusUpdate
-from app.api.deps import get_current_active_user
+from app.core.device_state import adjust_open_incidents
+from app.core.versions import bump_space_versions
+from app.core.stream import publish_incidents
+from app.core.pagination import paginate
+from app.core.ownership import owns_space
+from app.api.deps import get_current_active_user, UserIdentity, conditional_get, get_read_db, require_space_owner
 
 router = APIRouter()
 
 
-@router.get("/{space_id}/incidents", response_model=List[IncidentOut])
+@router.get(
+    "/{space_id}/incidents", response_model=List[IncidentOut],
+    dependencies=[Depends(require_space_owner), Depends(conditional_get("space"))]
+)
 def read_incidents(
         space_id: int,
         skip: int = 0,
         limit: int = 100,
         status: IncidentStatus = None,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        after: str = None,
+        response: Response = None,
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
-    # Перевірка, чи існує простір і чи належить він поточному користувачу
-    space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
-    if space is None:
-        raise HTTPException(status_code=404, detail="Space not found")
-
     # Формування запиту для інцидентів
-    query = db.query(Incident).join(
-        Incident.event
-    ).join(
-        Event.device
-    ).filter(
-        Device.space_id == space_id
-    )
+    query = db.query(Incident).filter(Incident.space_id == space_id)
 
     if status:
         query = query.filter(Incident.status == status)
 
-    # Сортування за часом створення (найновіші спочатку)
-    query = query.order_by(Incident.created_at.desc())
-
-    incidents = query.offset(skip).limit(limit).all()
-    return incidents
+    # Сортування за часом створення (найновіші спочатку), курсор наступної сторінки - в X-Next-Cursor
+    return paginate(query, Incident, skip, limit, after, response)
 
 
-@router.get("/incidents/{incident_id}", response_model=IncidentOut)
+@router.get(
+    "/incidents/{incident_id}", response_model=IncidentOut,
+    dependencies=[Depends(conditional_get("incident"))]
+)
 def read_incident(
         incident_id: int,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     # Знаходимо інцидент і перевіряємо, чи належить він до простору поточного користувача
-    incident = db.query(Incident).join(
-        Incident.event
-    ).join(
-        Event.device
-    ).join(
-        Device.space
-    ).filter(
-        Incident.id == incident_id,
-        Space.owner_id == current_user.id
-    ).first()
-
-    if incident is None:
+    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    if incident is None or not owns_space(db, current_user.id, incident.space_id):
         raise HTTPException(status_code=404, detail="Incident not found")
 
     return incident
@@ -77,32 +63,37 @@ def update_incident_status(
         incident_id: int,
         incident_update: IncidentStatusUpdate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     # Знаходимо інцидент і перевіряємо, чи належить він до простору поточного користувача
-    incident = db.query(Incident).join(
-        Incident.event
-    ).join(
-        Event.device
-    ).join(
-        Device.space
-    ).filter(
-        Incident.id == incident_id,
-        Space.owner_id == current_user.id
-    ).first()
-
-    if incident is None:
+    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    if incident is None or not owns_space(db, current_user.id, incident.space_id):
         raise HTTPException(status_code=404, detail="Incident not found")
 
-    # Оновлення статусу інциденту
+    # Оновлення лічильника відкритих інцидентів у стані пристрою. Рядок device_state блокується
+    # раніше за інцидент - у тому ж порядку, що й в обробнику подій, щоб уникнути взаємних блокувань
+    was_open = incident.status in OPEN_STATUSES
+    is_open = incident_update.status in OPEN_STATUSES
+    if incident.device_id is not None and was_open != is_open:
+        adjust_open_incidents(db, incident.device_id, 1 if is_open else -1)
+
     incident.status = incident_update.status
 
-    # Якщо статус "resolved" або "false_alarm", встановлюємо час вирішення
+    # Якщо статус "resolved" або "false_alarm", встановлюємо час вирішення;
+    # наступне спрацювання правила відкриє новий інцидент
     if incident_update.status in [IncidentStatus.RESOLVED, IncidentStatus.FALSE_ALARM]:
         incident.resolved_at = datetime.utcnow()
 
     db.add(incident)
-    db.commit()
+    space_id = incident.space_id
+    try:
+        db.commit()
+    except IntegrityError:
+        # Для правила пристрою вже відкрито новіший інцидент
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Another open incident exists for this device and rule")
+    bump_space_versions(db, [space_id])
     db.refresh(incident)
+    publish_incidents([incident])
 
     return incident
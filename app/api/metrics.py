@@ -0,0 +1,46 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import APIKeyHeader
+
+from app.config import settings
+from app.database import pool_stats
+from app.core.broker import stream_broker
+from app.core.device_cache import device_cache
+from app.core.event_writer import event_write_buffer
+from app.core.incident_rules import device_rules_cache
+from app.core.ownership import space_owner_cache
+from app.api.deps import hub_api_key_cache, user_cache
+
+router = APIRouter()
+
+metrics_key_header = APIKeyHeader(name="X-Metrics-Key", auto_error=False)
+
+
+def verify_metrics_key(key: str = Depends(metrics_key_header)):
+    # Без налаштованого ключа ендпоінт недоступний, щоб не розкривати внутрішній стан
+    if not settings.METRICS_API_KEY or not key or not hmac.compare_digest(key, settings.METRICS_API_KEY):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/metrics", dependencies=[Depends(verify_metrics_key)])
+async def read_metrics():
+    """
+    Метрики поточного процесу: пули з'єднань з базою даних, кеші, буфер групового коміту
+    і кількість стрімінгових з'єднань. Лічильники накопичуються з моменту запуску процесу.
+    """
+    return {
+        "db_pools": pool_stats(),
+        "caches": {
+            "users": user_cache.stats(),
+            "space_owners": space_owner_cache.stats(),
+            "hub_api_keys": hub_api_key_cache.stats(),
+            "devices": device_cache.stats(),
+            "device_rules": device_rules_cache.stats(),
+        },
+        "event_write_buffer": {
+            "running": event_write_buffer.running,
+            "queued": event_write_buffer.queued,
+        },
+        "stream_connections": stream_broker.connections,
+    }
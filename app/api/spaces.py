@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import List
 
 from app.database import get_db
-from app.models.device import Device
-from app.models.hub import Hub
-from app.models.user import User
+from app.config import settings
 from app.models.space import Space
+from app.models.hub import Hub
+from app.models.device import Device
+from app.models.incident import Incident, OPEN_STATUSES
 from app.schemas.space import SpaceCreate, SpaceOut, SpaceUpdate
-from app.api.deps import get_current_active_user
+from app.schemas.summary import HubStatusOut, SpaceSummary
+from app.core.counters import fill_space_counts
+from app.core.http_cache import etag_response
+from app.core.versions import bump_space_versions
+from app.core.ownership import invalidate_space_owner
+from app.api.deps import get_current_active_user, UserIdentity, conditional_get, get_read_db
 
 router = APIRouter()
 
@@ -17,7 +27,7 @@ router = APIRouter()
 def create_space(
         space: SpaceCreate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     db_space = Space(
         name=space.name,
@@ -28,47 +38,112 @@ def create_space(
     db.add(db_space)
     db.commit()
     db.refresh(db_space)
+    invalidate_space_owner(current_user.id)
     return db_space
 
 
-@router.get("/", response_model=List[SpaceOut])
+@router.get(
+    "/", response_model=List[SpaceOut],
+    dependencies=[Depends(conditional_get("user"))]
+)
 def read_spaces(
         skip: int = 0,
         limit: int = 100,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     spaces = db.query(Space).filter(Space.owner_id == current_user.id).offset(skip).limit(limit).all()
 
-    for space in spaces:
-        space.device_count = db.query(Device).filter(Device.space_id == space.id).count()
-        space.hub_count = db.query(Hub).filter(Hub.space_id == space.id).count()
-
-    return spaces
+    # Кількість пристроїв і хабів для всієї сторінки - одним запитом
+    return fill_space_counts(db, spaces)
 
 
-@router.get("/{space_id}", response_model=SpaceOut)
+@router.get(
+    "/{space_id}", response_model=SpaceOut,
+    dependencies=[Depends(conditional_get("space"))]
+)
 def read_space(
         space_id: int,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
     if space is None:
         raise HTTPException(status_code=404, detail="Space not found")
 
-    space.device_count = db.query(Device).filter(Device.space_id == space.id).count()
-    space.hub_count = db.query(Hub).filter(Hub.space_id == space.id).count()
-
+    fill_space_counts(db, [space])
     return space
 
 
+@router.get("/{space_id}/summary", response_model=SpaceSummary)
+def read_space_summary(
+        space_id: int,
+        request: Request,
+        incidents: int = Query(10, ge=0, le=100),
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
+):
+    """
+    Дані головного екрану простору за фіксовану кількість запитів: хаби зі статусом
+    онлайн, пристрої, кількість відкритих інцидентів за рівнем серйозності та останні
+    відкриті інциденти. Відповідь має ETag, на If-None-Match повертається 304.
+    """
+    space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
+    if space is None:
+        raise HTTPException(status_code=404, detail="Space not found")
+
+    hubs = db.query(Hub).filter(Hub.space_id == space_id).order_by(Hub.id).all()
+    devices = db.query(Device).filter(Device.space_id == space_id).order_by(Device.id).all()
+
+    open_incidents = dict(db.query(Incident.severity, func.count(Incident.id)).filter(
+        Incident.space_id == space_id,
+        Incident.status.in_(OPEN_STATUSES)
+    ).group_by(Incident.severity).all())
+
+    latest_incidents = db.query(Incident).filter(
+        Incident.space_id == space_id,
+        Incident.status.in_(OPEN_STATUSES)
+    ).order_by(Incident.created_at.desc(), Incident.id.desc()).limit(incidents).all()
+
+    # Лічильники рахуємо з уже завантажених списків без додаткових запитів
+    hub_devices = {}
+    for device in devices:
+        hub_devices[device.hub_id] = hub_devices.get(device.hub_id, 0) + 1
+    set_committed_value(space, "device_count", len(devices))
+    set_committed_value(space, "hub_count", len(hubs))
+
+    online_since = datetime.now(timezone.utc) - timedelta(seconds=settings.HUB_ONLINE_TIMEOUT)
+    hub_statuses = []
+    for hub in hubs:
+        last_connection = hub.last_connection
+        if last_connection is not None and last_connection.tzinfo is None:
+            last_connection = last_connection.replace(tzinfo=timezone.utc)
+        hub_statuses.append(HubStatusOut(
+            id=hub.id,
+            name=hub.name,
+            model=hub.model,
+            is_active=hub.is_active,
+            online=bool(hub.is_active and last_connection and last_connection >= online_since),
+            last_connection=hub.last_connection,
+            device_count=hub_devices.get(hub.id, 0)
+        ))
+
+    summary = SpaceSummary.model_validate({
+        "space": space,
+        "hubs": hub_statuses,
+        "devices": devices,
+        "open_incidents": open_incidents,
+        "latest_incidents": latest_incidents,
+    }, from_attributes=True)
+    return etag_response(request, summary)
+
+
 @router.put("/{space_id}", response_model=SpaceOut)
 def update_space(
         space_id: int,
         space_update: SpaceUpdate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
     if space is None:
@@ -79,7 +154,9 @@ def update_space(
 
     db.add(space)
     db.commit()
+    bump_space_versions(db, [space_id])
     db.refresh(space)
+    fill_space_counts(db, [space])
     return space
 
 
@@ -87,7 +164,7 @@ def update_space(
 def delete_space(
         space_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
     space = db.query(Space).filter(Space.id == space_id, Space.owner_id == current_user.id).first()
     if space is None:
@@ -95,4 +172,5 @@ def delete_space(
 
     db.delete(space)
     db.commit()
+    invalidate_space_owner(current_user.id)
     return None
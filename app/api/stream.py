@@ -0,0 +1,89 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.core.broker import stream_broker
+from app.core.stream import space_channel
+from app.core.ownership import owns_space
+from app.api.deps import get_user_from_token
+
+router = APIRouter()
+
+# EventSource у браузері не вміє надсилати заголовки, тому токен можна передати і в ?access_token=
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token", auto_error=False)
+
+
+async def authorize_stream(token: str, space_id: int):
+    """
+    Перевіряє токен і власника простору окремою короткою сесією,
+    щоб відкритий стрім не утримував з'єднання з пулу бази даних.
+    """
+    async with AsyncSessionLocal() as db:
+        user = await get_user_from_token(db, token)
+        if not user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        if not await db.run_sync(owns_space, user.id, space_id):
+            raise HTTPException(status_code=404, detail="Space not found")
+
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_messages(request: Request, channel: str):
+    """
+    Підписується на канал і надсилає клієнту його повідомлення у форматі SSE.
+    Підписка створюється всередині генератора, тому закривається в finally навіть тоді,
+    коли відповідь так і не почала надсилатися.
+    Якщо клієнт не встигав читати і частину повідомлень було відкинуто, надсилається
+    подія dropped з їх кількістю - клієнт має перечитати дані через звичайні ендпоінти.
+    """
+    subscription = stream_broker.subscribe(channel, settings.STREAM_QUEUE_SIZE)
+    try:
+        yield f"retry: {settings.STREAM_HEARTBEAT_INTERVAL * 1000}\n\n"
+        while not await request.is_disconnected():
+            message = await subscription.get(timeout=settings.STREAM_HEARTBEAT_INTERVAL)
+            dropped = subscription.take_dropped()
+            if dropped:
+                yield format_sse("dropped", {"count": dropped})
+            if message is None:
+                # Коментар-heartbeat не дає проксі закрити неактивне з'єднання
+                yield ": heartbeat\n\n"
+            else:
+                yield format_sse(message["type"], message["data"])
+    finally:
+        subscription.close()
+
+
+@router.get("/{space_id}/stream")
+async def stream_space(
+        space_id: int,
+        request: Request,
+        access_token: str = None,
+        token: str = Depends(optional_oauth2_scheme)
+):
+    token = token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    await authorize_stream(token, space_id)
+
+    if stream_broker.connections >= settings.STREAM_MAX_CONNECTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many stream connections",
+            headers={"Retry-After": str(settings.STREAM_HEARTBEAT_INTERVAL)},
+        )
+
+    return StreamingResponse(
+        stream_messages(request, space_channel(space_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
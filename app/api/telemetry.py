@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.config import settings
+from app.models.device import Device
+from app.models.telemetry import TelemetryBucket
+from app.schemas.telemetry import TelemetryPoint
+from app.core.telemetry import TELEMETRY_METRICS, BUCKET_SIZES, choose_bucket, read_rollups
+from app.core.ownership import owns_space
+from app.api.deps import get_current_active_user, UserIdentity, conditional_get, get_read_db
+
+router = APIRouter()
+
+
+@router.get(
+    "/devices/{device_id}/telemetry", response_model=List[TelemetryPoint],
+    dependencies=[Depends(conditional_get("device"))]
+)
+def read_telemetry(
+        device_id: int,
+        metric: str,
+        bucket: TelemetryBucket = None,
+        start: datetime = Query(None, alias="from"),
+        end: datetime = Query(None, alias="to"),
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
+):
+    """
+    Повертає агрегати показника пристрою (min, max, avg, count) за інтервалами часу.
+    Дані читаються з таблиці агрегатів, а не з сирих подій. Якщо bucket не задано,
+    обирається найдрібніший рівень, що дає не більше TELEMETRY_MAX_POINTS точок.
+    """
+    if metric not in TELEMETRY_METRICS.values():
+        raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}")
+
+    # Перевірка, чи існує пристрій і чи належить його простір поточному користувачу
+    space_id = db.query(Device.space_id).filter(Device.id == device_id).scalar()
+    if space_id is None or not owns_space(db, current_user.id, space_id):
+        raise HTTPException(status_code=404, detail="Device not found")
+
+    now = datetime.now(timezone.utc)
+    end = end or now
+    start = start or end - timedelta(days=1)
+    # Дати без часового поясу вважаємо UTC
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be earlier than 'to'")
+
+    if bucket is None:
+        bucket = choose_bucket(start, end, now)
+    elif (end - start) / BUCKET_SIZES[bucket] > settings.TELEMETRY_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range is too large for bucket {bucket.value}, at most {settings.TELEMETRY_MAX_POINTS} points are allowed"
+        )
+
+    return read_rollups(db, device_id, metric, bucket, start, end)
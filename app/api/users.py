@@ -6,7 +6,7 @@ from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserOut, UserUpdate
 from app.core.security import get_password_hash
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_read_db, invalidate_user, UserIdentity
 
 router = APIRouter()
 
@@ -32,16 +32,27 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserOut)
-def read_users_me(current_user: User = Depends(get_current_active_user)):
-    return current_user
+def read_users_me(
+        db: Session = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_active_user)
+):
+    # Автентифікація не завантажує профіль користувача, тому читаємо його тут
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 
 @router.put("/me", response_model=UserOut)
 def update_user_me(
         user_update: UserUpdate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: UserIdentity = Depends(get_current_active_user)
 ):
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
     if user_update.email is not None:
         # Перевірка, чи новий email не зайнятий іншим користувачем
         db_user = db.query(User).filter(User.email == user_update.email).first()
@@ -49,9 +60,14 @@ def update_user_me(
             raise HTTPException(status_code=400, detail="Email already registered")
 
     for key, value in user_update.dict(exclude_unset=True).items():
-        setattr(current_user, key, value)
+        setattr(user, key, value)
+
+    # Деактивація відкликає всі видані користувачу токени
+    if user_update.is_active is False:
+        user.token_version = User.token_version + 1
 
-    db.add(current_user)
+    db.add(user)
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    db.refresh(user)
+    invalidate_user(user.id)
+    return user
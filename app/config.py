@@ -4,6 +4,17 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def parse_mapping(value: str) -> dict:
+    """
+    Розбирає рядок вигляду "HOME=90,WAREHOUSE=730" у словник {"HOME": 90, "WAREHOUSE": 730}.
+    """
+    mapping = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        key, _, number = item.partition("=")
+        mapping[key.strip().upper()] = int(number)
+    return mapping
+
+
 class Settings:
     PROJECT_NAME: str = "Safe Space Platform"
     PROJECT_VERSION: str = "1.0.0"
@@ -14,12 +25,116 @@ class Settings:
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "safe_space_db")
 
-    DATABASE_URL: str = \
+    # DATABASE_URL, якщо задано, замінює URL, складений з POSTGRES_* (тести, бенчмарки, окремі бази даних)
+    DATABASE_URL: str = os.getenv(
+        "DATABASE_URL",
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    )
+    # Та сама база даних через асинхронний драйвер asyncpg (для async-ендпоінтів)
+    ASYNC_DATABASE_URL: str = os.getenv(
+        "ASYNC_DATABASE_URL", DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    )
+
+    # Пул з'єднань (окремий для синхронного і асинхронного рушія, в кожному процесі):
+    # постійні з'єднання, додаткові при піковому навантаженні, очікування вільного з'єднання
+    # (секунди), час життя з'єднання (секунди) і перевірка з'єднання перед видачею з пулу
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # statement_timeout для запитів застосунку в мілісекундах (0 - без обмеження)
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+    # Необов'язкова репліка для читання: GET-ендпоінти користувачів читають з неї.
+    # Протягом READ_YOUR_WRITES_WINDOW секунд після зміни даних (позначка в cookie)
+    # користувач читає з основної бази, щоб не побачити дані до своєї зміни
+    READ_REPLICA_URL: str = os.getenv("READ_REPLICA_URL", "")
+    READ_YOUR_WRITES_WINDOW: int = int(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+    READ_YOUR_WRITES_COOKIE: str = os.getenv("READ_YOUR_WRITES_COOKIE", "last_write")
+
+    # Ключ доступу до GET /api/metrics (заголовок X-Metrics-Key); без ключа ендпоінт вимкнено
+    METRICS_API_KEY: str = os.getenv("METRICS_API_KEY", "")
 
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-for-jwt")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Максимальна кількість подій в одному пакетному запиті від хаба
+    EVENT_BATCH_MAX_SIZE: int = int(os.getenv("EVENT_BATCH_MAX_SIZE", "1000"))
+
+    # Кеш користувачів для автентифікації за JWT (id -> is_active, token_version)
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL: int = int(os.getenv("USER_CACHE_TTL", "60"))
+    # True - довіряти is_active і token_version з токена без звернення до бази даних і кешу.
+    # Деактивація тоді набуває чинності лише після закінчення строку дії токена
+    JWT_TRUST_CLAIMS: bool = os.getenv("JWT_TRUST_CLAIMS", "false").lower() == "true"
+
+    # Кеш належності просторів користувачам (user_id -> ID просторів) для перевірки доступу
+    SPACE_OWNER_CACHE_SIZE: int = int(os.getenv("SPACE_OWNER_CACHE_SIZE", "10000"))
+    SPACE_OWNER_CACHE_TTL: int = int(os.getenv("SPACE_OWNER_CACHE_TTL", "300"))
+
+    # Кеш автентифікації хабів за API-ключем
+    HUB_API_KEY_CACHE_SIZE: int = int(os.getenv("HUB_API_KEY_CACHE_SIZE", "10000"))
+    HUB_API_KEY_CACHE_TTL: int = int(os.getenv("HUB_API_KEY_CACHE_TTL", "60"))
+
+    # Кеш пристроїв для прийому подій (кількість записів; кожен пристрій займає до двох)
+    DEVICE_CACHE_SIZE: int = int(os.getenv("DEVICE_CACHE_SIZE", "400000"))
+    DEVICE_CACHE_TTL: int = int(os.getenv("DEVICE_CACHE_TTL", "600"))
+
+    # Груповий коміт подій: запис накопиченого буфера одним INSERT
+    EVENT_GROUP_COMMIT_ENABLED: bool = os.getenv("EVENT_GROUP_COMMIT_ENABLED", "false").lower() == "true"
+    EVENT_GROUP_COMMIT_MAX_BATCH: int = int(os.getenv("EVENT_GROUP_COMMIT_MAX_BATCH", "500"))
+    EVENT_GROUP_COMMIT_MAX_WAIT_MS: int = int(os.getenv("EVENT_GROUP_COMMIT_MAX_WAIT_MS", "10"))
+
+    # Обробка подій: "background" - у веб-воркері через BackgroundTasks,
+    # "worker" - окремим процесом (python -m app.worker)
+    EVENT_PROCESSING_MODE: str = os.getenv("EVENT_PROCESSING_MODE", "background")
+    WORKER_BATCH_SIZE: int = int(os.getenv("WORKER_BATCH_SIZE", "100"))
+    WORKER_POLL_INTERVAL: float = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+    # Кількість невдалих спроб обробки, після якої подія позначається як failed і пропускається
+    EVENT_MAX_ATTEMPTS: int = int(os.getenv("EVENT_MAX_ATTEMPTS", "3"))
+
+    # Кеш скомпільованих правил інцидентів для пристроїв. Запис перевіряється за полями пристрою,
+    # завантаженого з подією, тому зміна порогів діє одразу в усіх процесах
+    DEVICE_RULES_CACHE_SIZE: int = int(os.getenv("DEVICE_RULES_CACHE_SIZE", "200000"))
+    DEVICE_RULES_CACHE_TTL: int = int(os.getenv("DEVICE_RULES_CACHE_TTL", "600"))
+
+    # Об'єднання повторних інцидентів і debounce порогових правил
+    INCIDENT_DEBOUNCE_HITS: int = int(os.getenv("INCIDENT_DEBOUNCE_HITS", "1"))
+
+    # Диспетчер сповіщень: мінімальний інтервал між повідомленнями одному отримувачу (секунди)
+    NOTIFICATION_MIN_INTERVAL: int = int(os.getenv("NOTIFICATION_MIN_INTERVAL", "300"))
+    NOTIFICATION_BATCH_WINDOW_MS: int = int(os.getenv("NOTIFICATION_BATCH_WINDOW_MS", "500"))
+    NOTIFICATION_QUEUE_SIZE: int = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "10000"))
+
+    # Секціонування та строк зберігання подій (python -m app.maintenance)
+    EVENT_PARTITION_MONTHS_AHEAD: int = int(os.getenv("EVENT_PARTITION_MONTHS_AHEAD", "3"))
+    EVENT_PARTITION_DETACH_ONLY: bool = os.getenv("EVENT_PARTITION_DETACH_ONLY", "false").lower() == "true"
+    EVENT_RETENTION_DAYS: int = int(os.getenv("EVENT_RETENTION_DAYS", "365"))
+    # Окремі строки зберігання для типів просторів, наприклад "HOME=90,WAREHOUSE=730"
+    EVENT_RETENTION_DAYS_BY_SPACE_TYPE: dict = parse_mapping(os.getenv("EVENT_RETENTION_DAYS_BY_SPACE_TYPE", ""))
+
+    # Агрегати телеметрії: строк зберігання хвилинних і годинних агрегатів (добові зберігаються завжди)
+    TELEMETRY_MINUTE_RETENTION_DAYS: int = int(os.getenv("TELEMETRY_MINUTE_RETENTION_DAYS", "14"))
+    TELEMETRY_HOUR_RETENTION_DAYS: int = int(os.getenv("TELEMETRY_HOUR_RETENTION_DAYS", "365"))
+    # Максимальна кількість точок у відповіді /telemetry
+    TELEMETRY_MAX_POINTS: int = int(os.getenv("TELEMETRY_MAX_POINTS", "1500"))
+
+    # Лічильники пристроїв і хабів: True - читати з колонок-лічильників spaces/hubs,
+    # False - рахувати одним агрегатним запитом на сторінку (лічильники ведуться в обох режимах)
+    COUNTER_CACHE_ENABLED: bool = os.getenv("COUNTER_CACHE_ENABLED", "false").lower() == "true"
+
+    # Хаб вважається онлайн, якщо останній ping був не раніше ніж HUB_ONLINE_TIMEOUT секунд тому
+    HUB_ONLINE_TIMEOUT: int = int(os.getenv("HUB_ONLINE_TIMEOUT", "300"))
+
+    # Стрім подій та інцидентів простору (SSE): брокер "memory" (в межах процесу)
+    # або "postgres" (LISTEN/NOTIFY між вузлами), розмір черги одного клієнта,
+    # інтервал heartbeat (секунди) і максимальна кількість з'єднань на процес
+    STREAM_BROKER: str = os.getenv("STREAM_BROKER", "memory")
+    STREAM_QUEUE_SIZE: int = int(os.getenv("STREAM_QUEUE_SIZE", "100"))
+    STREAM_HEARTBEAT_INTERVAL: int = int(os.getenv("STREAM_HEARTBEAT_INTERVAL", "15"))
+    STREAM_MAX_CONNECTIONS: int = int(os.getenv("STREAM_MAX_CONNECTIONS", "5000"))
+
 
 settings = Settings()
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+from typing import Dict, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Підписка одного клієнта на канал з обмеженою чергою.
+    Якщо клієнт не встигає читати, найстаріші повідомлення відкидаються,
+    а кількість відкинутих накопичується в dropped до наступного читання.
+    """
+
+    def __init__(self, broker: "Broker", channel: str, maxsize: int):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def deliver(self, message: dict):
+        # Викликається лише в циклі подій підписки
+        if self.closed:
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """
+        Повертає наступне повідомлення або None, якщо за timeout секунд нічого не надійшло.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Брокер повідомлень між шляхом запису подій (будь-який потік) і підписками
+    стрімінгових клієнтів (цикл подій веб-воркера). Базова реалізація доставляє
+    повідомлення лише в межах процесу; підкласи можуть розсилати їх між вузлами,
+    перевизначивши publish і викликаючи deliver_local при отриманні.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def connections(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def subscribe(self, channel: str, maxsize: int) -> Subscription:
+        subscription = Subscription(self, channel, maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def has_subscribers(self, channel: str) -> bool:
+        """
+        Чи варто готувати повідомлення для каналу. Брокери між вузлами повертають True завжди.
+        """
+        with self._lock:
+            return channel in self._subscriptions
+
+    def publish(self, channel: str, message: dict):
+        """
+        Надсилає повідомлення підписникам каналу. Безпечно викликати з будь-якого потоку.
+        """
+        self.deliver_local(channel, message)
+
+    def deliver_local(self, channel: str, message: dict):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # Цикл подій підписки вже закрито
+                subscription.close()
+
+
+class PostgresBroker(Broker):
+    """
+    Розсилка повідомлень між вузлами через PostgreSQL LISTEN/NOTIFY.
+    Повідомлення надсилаються окремим потоком пакетами, щоб не блокувати шлях запису подій,
+    а кожен вузол слухає канал окремим з'єднанням поза пулом і доставляє отримані
+    повідомлення своїм підписникам.
+    """
+
+    NOTIFY_CHANNEL = "safe_space_stream"
+    # Обмеження PostgreSQL на розмір payload в NOTIFY
+    MAX_PAYLOAD = 7900
+    # Скільки повідомлень з черги надсилається одним запитом і однією транзакцією
+    NOTIFY_BATCH_SIZE = 100
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self._outbox: queue.Queue = queue.Queue(maxsize=10000)
+        self._threads: Dict[str, threading.Thread] = {}
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def has_subscribers(self, channel: str) -> bool:
+        return True
+
+    def start(self):
+        self._start_thread("broker-notify", self._send)
+        self._start_thread("broker-listen", self._listen)
+
+    def _start_thread(self, name: str, target):
+        with self._start_lock:
+            if name in self._threads:
+                return
+            self._stopping.clear()
+            self._threads[name] = threading.Thread(target=target, name=name, daemon=True)
+            self._threads[name].start()
+
+    def stop(self):
+        self._stopping.set()
+        for thread in self._threads.values():
+            thread.join(timeout=5)
+        self._threads = {}
+
+    def publish(self, channel: str, message: dict):
+        # Процеси, які лише публікують (наприклад app.worker), не слухають канал
+        self._start_thread("broker-notify", self._send)
+        payload = json.dumps({"channel": channel, "message": message}, default=str)
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            logger.warning(f"Stream message for {channel} is too large for NOTIFY, delivering locally only")
+            self.deliver_local(channel, message)
+            return
+        try:
+            self._outbox.put_nowait(payload)
+        except queue.Full:
+            logger.warning(f"Stream outbox is full, dropping message for {channel}")
+
+    def _send(self):
+        while not self._stopping.is_set():
+            try:
+                payloads = [self._outbox.get(timeout=1)]
+            except queue.Empty:
+                continue
+            # Забираємо все, що накопичилося в черзі, і надсилаємо одним запитом
+            while len(payloads) < self.NOTIFY_BATCH_SIZE:
+                try:
+                    payloads.append(self._outbox.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self.engine.connect() as conn:
+                    conn.exec_driver_sql(
+                        "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) WITH ORDINALITY AS p(payload, n) ORDER BY n",
+                        (self.NOTIFY_CHANNEL, payloads)
+                    )
+                    conn.commit()
+            except Exception:
+                logger.exception(f"Failed to publish {len(payloads)} stream messages")
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                # З'єднання з autocommit і активним LISTEN не повертається в пул:
+                # після detach close() закриває його, а не віддає іншим запитам
+                connection = self.engine.raw_connection()
+                connection.detach()
+                driver_connection = connection.dbapi_connection
+                driver_connection.autocommit = True
+                driver_connection.cursor().execute(f"LISTEN {self.NOTIFY_CHANNEL}")
+                while not self._stopping.is_set():
+                    if select.select([driver_connection], [], [], 1) == ([], [], []):
+                        continue
+                    driver_connection.poll()
+                    while driver_connection.notifies:
+                        notify = driver_connection.notifies.pop(0)
+                        data = json.loads(notify.payload)
+                        self.deliver_local(data["channel"], data["message"])
+            except Exception:
+                logger.exception("Stream listener failed, reconnecting")
+                self._stopping.wait(1)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+
+def create_broker() -> Broker:
+    if settings.STREAM_BROKER == "postgres":
+        from app.database import engine
+        return PostgresBroker(engine)
+    return Broker()
+
+
+stream_broker = create_broker()
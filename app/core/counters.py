@@ -0,0 +1,76 @@
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import settings
+from app.models.device import Device
+from app.models.hub import Hub
+from app.models.space import Space
+
+
+def update_device_counters(db: Session, old_space_id: Optional[int], old_hub_id: Optional[int],
+                           new_space_id: Optional[int], new_hub_id: Optional[int]):
+    """
+    Оновлює лічильники пристроїв простору і хаба в поточній транзакції.
+    Для нового пристрою old_* дорівнюють None, для видаленого - new_*.
+    """
+    if old_space_id != new_space_id:
+        if old_space_id is not None:
+            db.execute(update(Space).where(Space.id == old_space_id).values(device_count=Space.device_count - 1))
+        if new_space_id is not None:
+            db.execute(update(Space).where(Space.id == new_space_id).values(device_count=Space.device_count + 1))
+
+    if old_hub_id != new_hub_id:
+        if old_hub_id is not None:
+            db.execute(update(Hub).where(Hub.id == old_hub_id).values(device_count=Hub.device_count - 1))
+        if new_hub_id is not None:
+            db.execute(update(Hub).where(Hub.id == new_hub_id).values(device_count=Hub.device_count + 1))
+
+
+def update_hub_counters(db: Session, space_id: int, delta: int):
+    db.execute(update(Space).where(Space.id == space_id).values(hub_count=Space.hub_count + delta))
+
+
+def fill_space_counts(db: Session, spaces: List[Space]) -> List[Space]:
+    """
+    Заповнює device_count і hub_count для сторінки просторів одним запитом.
+    При COUNTER_CACHE_ENABLED значення вже завантажені з колонок-лічильників.
+    """
+    if settings.COUNTER_CACHE_ENABLED or not spaces:
+        return spaces
+
+    device_count = select(func.count(Device.id)).where(Device.space_id == Space.id).scalar_subquery()
+    hub_count = select(func.count(Hub.id)).where(Hub.space_id == Space.id).scalar_subquery()
+    counts = {
+        space_id: (devices, hubs)
+        for space_id, devices, hubs in db.execute(
+            select(Space.id, device_count, hub_count).where(Space.id.in_([space.id for space in spaces]))
+        )
+    }
+
+    # set_committed_value не позначає об'єкт зміненим, тому сесія не запише ці значення в базу
+    for space in spaces:
+        devices, hubs = counts.get(space.id, (0, 0))
+        set_committed_value(space, "device_count", devices)
+        set_committed_value(space, "hub_count", hubs)
+    return spaces
+
+
+def fill_hub_counts(db: Session, hubs: List[Hub]) -> List[Hub]:
+    """
+    Заповнює device_count для сторінки хабів одним запитом з GROUP BY.
+    """
+    if settings.COUNTER_CACHE_ENABLED or not hubs:
+        return hubs
+
+    counts = dict(db.execute(
+        select(Device.hub_id, func.count(Device.id)).where(
+            Device.hub_id.in_([hub.id for hub in hubs])
+        ).group_by(Device.hub_id)
+    ).all())
+
+    for hub in hubs:
+        set_committed_value(hub, "device_count", counts.get(hub.id, 0))
+    return hubs
@@ -0,0 +1,71 @@
+from typing import NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.models.device import Device
+
+
+class DeviceIdentity(NamedTuple):
+    id: int
+    hub_id: Optional[int]
+    space_id: Optional[int]
+    zigbee_id: Optional[str]
+
+
+# Кеш пристроїв для шляху прийому подій. Кожен пристрій зберігається під двома ключами:
+# ("id", hub_id, device_id) та ("zigbee", hub_id, zigbee_id).
+device_cache = TTLCache(
+    maxsize=settings.DEVICE_CACHE_SIZE,
+    ttl=settings.DEVICE_CACHE_TTL
+)
+
+
+def cache_device(device) -> DeviceIdentity:
+    identity = DeviceIdentity(
+        id=device.id, hub_id=device.hub_id, space_id=device.space_id, zigbee_id=device.zigbee_id
+    )
+    device_cache.set(("id", identity.hub_id, identity.id), identity)
+    if identity.zigbee_id:
+        device_cache.set(("zigbee", identity.hub_id, identity.zigbee_id), identity)
+    return identity
+
+
+def invalidate_device(hub_id: Optional[int], device_id: int, zigbee_id: Optional[str] = None):
+    device_cache.invalidate(("id", hub_id, device_id))
+    if zigbee_id:
+        device_cache.invalidate(("zigbee", hub_id, zigbee_id))
+
+
+def get_cached_device(hub_id: int, device_id: Optional[int] = None,
+                      zigbee_id: Optional[str] = None) -> Optional[DeviceIdentity]:
+    if device_id is not None:
+        identity = device_cache.get(("id", hub_id, device_id))
+        if identity is not None:
+            return identity
+    if zigbee_id:
+        return device_cache.get(("zigbee", hub_id, zigbee_id))
+    return None
+
+
+def resolve_device(db: Session, hub_id: int, device_id: Optional[int] = None,
+                   zigbee_id: Optional[str] = None) -> Optional[DeviceIdentity]:
+    """
+    Знаходить пристрій хаба за ID, а якщо не знайдено - за Zigbee ID.
+    Спочатку перевіряє кеш, і лише при промаху звертається до бази даних.
+    """
+    identity = get_cached_device(hub_id, device_id, zigbee_id)
+    if identity is not None:
+        return identity
+
+    columns = (Device.id, Device.hub_id, Device.space_id, Device.zigbee_id)
+    device = None
+    if device_id is not None:
+        device = db.query(*columns).filter(Device.id == device_id, Device.hub_id == hub_id).first()
+    if device is None and zigbee_id:
+        device = db.query(*columns).filter(Device.zigbee_id == zigbee_id, Device.hub_id == hub_id).first()
+    if device is None:
+        return None
+
+    return cache_device(device)
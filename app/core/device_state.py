@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, literal_column, update
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.orm import Session
+
+from app.models.device_state import DeviceState
+from app.models.event import Event
+from app.models.incident import Incident
+
+# Об'єднання показників за ключем: для кожного показника лишається запис з новішим "at",
+# тож пакет, оброблений не за порядком часу, не перезапише свіжіше значення старим
+MERGE_READINGS = literal_column("""(
+    SELECT coalesce(jsonb_object_agg(latest.key, latest.value), '{}'::jsonb) FROM (
+        SELECT DISTINCT ON (merged.key) merged.key, merged.value FROM (
+            SELECT key, value FROM jsonb_each(device_state.readings)
+            UNION ALL
+            SELECT key, value FROM jsonb_each(excluded.readings)
+        ) AS merged
+        ORDER BY merged.key, (merged.value ->> 'at')::timestamptz DESC NULLS LAST
+    ) AS latest
+)""", type_=JSONB)
+
+
+def lock_debounce_states(db: Session, device_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Завантажує лічильники debounce пристроїв і блокує їхні рядки device_state до кінця транзакції,
+    тож воркери, які обробляють події одного пристрою, рахують спрацювання послідовно.
+    Рядки блокуються в порядку device_id. Для пристроїв без стану повертається порожній словник.
+    """
+    device_ids = sorted(set(device_ids))
+    states = {device_id: {} for device_id in device_ids}
+    if not device_ids:
+        return states
+
+    rows = db.query(DeviceState.device_id, DeviceState.debounce).filter(
+        DeviceState.device_id.in_(device_ids)
+    ).order_by(DeviceState.device_id).with_for_update().all()
+    for row in rows:
+        states[row.device_id] = dict(row.debounce or {})
+    return states
+
+
+def register_hit(debounce: dict, event_type, rule: Optional[str]) -> int:
+    """
+    Оновлює лічильник послідовних спрацювань правила в debounce-стані пристрою.
+    Подія без спрацювання (rule=None) скидає лічильник свого типу. Повертає поточне значення.
+    """
+    key = event_type.value
+    if rule is None:
+        debounce.pop(key, None)
+        return 0
+
+    previous = debounce.get(key) or {}
+    count = previous.get("count", 0) + 1 if previous.get("rule") == rule else 1
+    debounce[key] = {"rule": rule, "count": count}
+    return count
+
+
+def update_device_states(
+        db: Session, events: List[Event], incidents: List[Incident], debounce: Optional[Dict[int, dict]] = None
+) -> int:
+    """
+    Оновлює стан пристроїв за пакетом подій одним INSERT ... ON CONFLICT DO UPDATE:
+    останню подію, останні значення показників, кількість нових відкритих інцидентів
+    і, якщо передано, лічильники debounce (див. lock_debounce_states).
+    Повертає кількість оновлених пристроїв.
+    """
+    states = {}
+    for event in sorted(events, key=lambda event: (event.created_at, event.id)):
+        if event.device_id is None:
+            continue
+        state = states.setdefault(event.device_id, {
+            "device_id": event.device_id,
+            "space_id": event.space_id,
+            "readings": {},
+            "open_incident_count": 0,
+        })
+        state["last_event_type"] = event.type
+        state["last_event_at"] = event.created_at
+        if event.value is not None:
+            state["readings"][event.type.value] = {
+                "value": event.value,
+                "unit": event.unit,
+                "at": event.created_at.isoformat(),
+            }
+
+    for incident in incidents:
+        if incident.device_id in states:
+            states[incident.device_id]["open_incident_count"] += 1
+
+    if debounce is not None:
+        for device_id, state in states.items():
+            state["debounce"] = debounce.get(device_id, {})
+
+    if not states:
+        return 0
+
+    # Сортування за device_id задає однаковий порядок блокування рядків для паралельних воркерів
+    statement = insert(DeviceState).values([states[device_id] for device_id in sorted(states)])
+    excluded = statement.excluded
+    # Пакет може прийти не за порядком часу, тому остання подія замінюється лише новішою
+    is_newer = (DeviceState.last_event_at.is_(None)) | (excluded.last_event_at >= DeviceState.last_event_at)
+    set_ = {
+        "space_id": excluded.space_id,
+        "last_event_type": case((is_newer, excluded.last_event_type), else_=DeviceState.last_event_type),
+        "last_event_at": func.greatest(DeviceState.last_event_at, excluded.last_event_at),
+        "readings": MERGE_READINGS,
+        "open_incident_count": DeviceState.open_incident_count + excluded.open_incident_count,
+        "updated_at": func.now(),
+    }
+    if debounce is not None:
+        # Рядки заблоковано в lock_debounce_states, тож новий стан можна записати поверх старого
+        set_["debounce"] = excluded.debounce
+    db.execute(statement.on_conflict_do_update(index_elements=[DeviceState.device_id], set_=set_))
+    return len(states)
+
+
+def adjust_open_incidents(db: Session, device_id: int, delta: int):
+    db.execute(update(DeviceState).where(DeviceState.device_id == device_id).values(
+        open_incident_count=func.greatest(DeviceState.open_incident_count + delta, 0)
+    ))
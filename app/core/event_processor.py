@@ -1,124 +1,220 @@
-from sqlalchemy.orm import Session
+import logging
+from typing import List
+
+from sqlalchemy import case, literal_column, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.sql import func
+from app.config import settings
 from app.database import SessionLocal
-from app.models.event import Event, EventType
-from app.models.incident import Incident, IncidentStatus, IncidentSeverity
-from app.core.notification import send_incident_notification
+from app.models.event import Event
+from app.models.incident import Incident, OPEN_STATUSES
+from app.core.notification_dispatcher import notification_dispatcher
+from app.core.incident_rules import evaluate_event
+from app.core.telemetry import update_rollups
+from app.core.device_state import lock_debounce_states, register_hit, update_device_states
+from app.core.versions import bump_space_versions
+from app.core.stream import publish_incidents
+
+logger = logging.getLogger(__name__)
+
+# Ознака того, що рядок вставлено, а не оновлено в INSERT ... ON CONFLICT DO UPDATE (PostgreSQL)
+INSERTED = literal_column("xmax = 0").label("inserted")
+# Умова індексу ix_incidents_open_device_id_rule передається літералом, а не параметрами запиту,
+# щоб PostgreSQL міг вибрати цей частковий індекс для ON CONFLICT
+OPEN_INCIDENT_PREDICATE = text("status IN ({})".format(", ".join(f"'{status.name}'" for status in OPEN_STATUSES)))
 
 
 def process_event(event_id: int):
     """
     Обробляє подію, визначає чи це інцидент, і якщо так - створює запис про інцидент.
     """
-    db = SessionLocal()
-    try:
-        event = db.query(Event).filter(Event.id == event_id).first()
-        if not event:
-            return
+    process_events([event_id])
 
-        # Позначаємо подію як оброблену
-        event.processed = True
-        db.add(event)
-        db.commit()
 
-        # Аналізуємо подію для визначення, чи це інцидент
-        incident_data = analyze_event(event)
+def process_events(event_ids: List[int]):
+    """
+    Обробляє пакет подій: завантажує їх разом з пристроями одним запитом,
+    створює інциденти одним INSERT і позначає події обробленими одним UPDATE.
+    """
+    if not event_ids:
+        return
 
-        if incident_data:
-            # Створюємо запис про інцидент
-            incident = Incident(
-                title=incident_data["title"],
-                description=incident_data["description"],
-                severity=incident_data["severity"],
-                data=incident_data["data"],
-                event_id=event.id
-            )
-            db.add(incident)
-            db.commit()
-            db.refresh(incident)
-
-            # Надсилаємо сповіщення про інцидент
-            send_incident_notification(incident)
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        events = query_events_for_processing(db).filter(
+            Event.id.in_(event_ids),
+            Event.processed == False
+        ).order_by(Event.id).all()
+        handle_events_isolated(db, events)
+    finally:
+        db.close()
 
+
+def process_pending_events(batch_size: int) -> int:
+    """
+    Забирає пакет необроблених подій з таблиці events і обробляє їх.
+    Рядки блокуються через FOR UPDATE SKIP LOCKED, тому кілька воркерів
+    (процесів або вузлів) можуть працювати одночасно, не обробляючи одну подію двічі.
+    Повертає кількість оброблених подій.
+    """
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        events = query_events_for_processing(db).filter(
+            Event.processed == False
+        ).order_by(Event.id).limit(batch_size).with_for_update(skip_locked=True, of=Event).all()
+        handle_events_isolated(db, events)
+        return len(events)
     finally:
         db.close()
 
 
+def query_events_for_processing(db: Session):
+    # Пристрій потрібен правилам аналізу, тому завантажуємо його одразу
+    return db.query(Event).options(joinedload(Event.device))
+
+
+def handle_events_isolated(db: Session, events: List[Event]) -> List[Incident]:
+    """
+    Обробляє пакет так само, як handle_events, але помилка однієї події не блокує решту:
+    пакет, що не вдалося обробити, ділиться навпіл, доки невдалою не залишиться одна подія.
+    Для неї збільшується лічильник спроб, а після EVENT_MAX_ATTEMPTS вона позначається як failed.
+    """
+    if not events:
+        return []
+
+    try:
+        return handle_events(db, events)
+    except Exception:
+        db.rollback()
+        if len(events) == 1:
+            logger.exception(f"Failed to process event {events[0].id}")
+            record_failure(db, events[0].id)
+            return []
+
+    # Відкат зняв блокування рядків, тому половини пакета блокуються повторно;
+    # події, які вже забрав інший воркер, пропускаються
+    event_ids = [event.id for event in events]
+    middle = len(event_ids) // 2
+    incidents = []
+    for part in (event_ids[:middle], event_ids[middle:]):
+        incidents += handle_events_isolated(db, lock_events(db, part))
+    return incidents
+
+
+def lock_events(db: Session, event_ids: List[int]) -> List[Event]:
+    return query_events_for_processing(db).filter(
+        Event.id.in_(event_ids),
+        Event.processed == False
+    ).order_by(Event.id).with_for_update(skip_locked=True, of=Event).all()
+
+
+def record_failure(db: Session, event_id: int):
+    """
+    Фіксує невдалу спробу обробки події окремою транзакцією.
+    Подія, що вичерпала спроби, знімається з черги (processed) з позначкою failed_at.
+    """
+    exhausted = Event.attempts + 1 >= settings.EVENT_MAX_ATTEMPTS
+    try:
+        db.execute(
+            update(Event).where(Event.id == event_id).values(
+                attempts=Event.attempts + 1,
+                failed_at=case((exhausted, func.now()), else_=None),
+                processed=exhausted,
+            ).execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception(f"Failed to record processing failure of event {event_id}")
+
+
+def handle_events(db: Session, events: List[Event]) -> List[Incident]:
+    """
+    Аналізує пакет подій і фіксує результат однією транзакцією.
+    Повторні спрацювання правила на пристрої, для якого вже є відкритий інцидент
+    (NEW або ACKNOWLEDGED), додаються до нього замість створення нового.
+    Повертає лише нові інциденти.
+    """
+    if not events:
+        return []
+
+    # Відбираємо події, що спрацювали, з урахуванням debounce. Лічильники зберігаються в device_state,
+    # тому послідовність спрацювань не залежить від того, який процес обробляє подію
+    debounce = lock_debounce_states(db, [event.device_id for event in events if event.device_id is not None])
+    matches = []
+    for event in events:
+        incident_data = analyze_event(event)
+        if event.device_id is None:
+            continue
+        hits = register_hit(debounce[event.device_id], event.type, incident_data["rule"] if incident_data else None)
+        if incident_data and hits >= incident_data["debounce"]:
+            matches.append((event, incident_data))
+
+    rows = {}
+    for event, incident_data in matches:
+        key = (event.device_id, incident_data["rule"])
+        if key in rows:
+            rows[key]["hit_count"] += 1
+            rows[key]["last_seen_at"] = max(rows[key]["last_seen_at"], event.created_at)
+        else:
+            rows[key] = incident_row(event, incident_data)
+
+    touched = []
+    incidents = []
+    if rows:
+        # Один INSERT ... ON CONFLICT за унікальним індексом відкритих інцидентів: якщо інцидент
+        # уже відкрито (зокрема іншим воркером), до нього додаються спрацювання. Рядки впорядковано,
+        # щоб паралельні воркери блокували інциденти в однаковому порядку
+        statement = insert(Incident).values([rows[key] for key in sorted(rows)])
+        excluded = statement.excluded
+        result = db.execute(statement.on_conflict_do_update(
+            index_elements=[Incident.device_id, Incident.rule],
+            index_where=OPEN_INCIDENT_PREDICATE,
+            set_={
+                "hit_count": Incident.hit_count + excluded.hit_count,
+                "last_seen_at": func.greatest(Incident.last_seen_at, excluded.last_seen_at),
+                "updated_at": func.now(),
+            }
+        ).returning(Incident, INSERTED)).all()
+        touched = [incident for incident, _ in result]
+        incidents = [incident for incident, inserted in result if inserted]
+
+    # Агрегати телеметрії і стан пристроїв оновлюються в тій самій транзакції, що й позначка processed
+    update_rollups(db, events)
+    update_device_states(db, events, incidents, debounce)
+
+    db.query(Event).filter(
+        Event.id.in_([event.id for event in events])
+    ).update({Event.processed: True}, synchronize_session=False)
+    db.commit()
+    bump_space_versions(db, [event.space_id for event in events])
+
+    # Сповіщення ставляться в чергу лише після коміту і надсилаються окремим потоком
+    notification_dispatcher.enqueue([incident.id for incident in incidents])
+    publish_incidents(touched)
+
+    return incidents
+
+
+def incident_row(event: Event, incident_data: dict, hit_count: int = 1, last_seen_at=None) -> dict:
+    return {
+        "title": incident_data["title"],
+        "description": incident_data["description"],
+        "severity": incident_data["severity"],
+        "data": incident_data["data"],
+        "event_id": event.id,
+        "device_id": event.device_id,
+        "space_id": event.space_id,
+        "rule": incident_data["rule"],
+        "hit_count": hit_count,
+        "last_seen_at": last_seen_at or event.created_at
+    }
+
+
 def analyze_event(event: Event) -> dict:
     """
     Аналізує подію і визначає, чи є вона інцидентом.
     Повертає None, якщо подія не є інцидентом, або словник з даними інциденту.
     """
-    # Логіка для визначення, чи є подія інцидентом, залежить від типу події
-    if event.type == EventType.SMOKE_DETECTED:
-        return {
-            "title": "Smoke detected",
-            "description": f"Smoke was detected by device {event.device.name} in {event.device.location or 'unknown location'}",
-            "severity": IncidentSeverity.HIGH,
-            "data": event.data
-        }
-
-    elif event.type == EventType.WATER_LEAK_DETECTED:
-        return {
-            "title": "Water leak detected",
-            "description": f"Water leak was detected by device {event.device.name} in {event.device.location or 'unknown location'}",
-            "severity": IncidentSeverity.MEDIUM,
-            "data": event.data
-        }
-
-    elif event.type == EventType.MOTION_DETECTED:
-        return None
-
-    elif event.type == EventType.DOOR_OPENED:
-        # Аналогічно, можна додати логіку для визначення, чи відкриття дверей є підозрілим
-        return None
-
-    elif event.type == EventType.TEMPERATURE:
-        # Перевіряємо, чи температура перевищує певний поріг
-        temperature = event.data.get("temperature", 0)
-        if temperature > 15:
-            return {
-                "title": "High temperature detected",
-                "description": f"Temperature of {temperature}°C was detected by device {event.device.name} in {event.device.location or 'unknown location'}",
-                "severity": IncidentSeverity.MEDIUM,
-                "data": event.data
-            }
-        elif temperature < 15:
-            return {
-                "title": "Low temperature detected",
-                "description": f"Temperature of {temperature}°C was detected by device {event.device.name} in {event.device.location or 'unknown location'}",
-                "severity": IncidentSeverity.MEDIUM,
-                "data": event.data
-            }
-        return None
-
-    elif event.type == EventType.HUMIDITY:
-        humidity = event.data.get("humidity", 0)
-        if humidity > 15:
-            return {
-                "title": "High humidity detected",
-                "description": f"Humidity: {humidity}% was detected by device {event.device.name} in {event.device.location or 'unknown location'}",
-                "severity": IncidentSeverity.MEDIUM,
-                "data": event.data
-            }
-        elif humidity < 15:
-            return {
-                "title": "Low humidity detected",
-                "description": f"Humidity: {humidity}% was detected by device {event.device.name} in {event.device.location or 'unknown location'}",
-                "severity": IncidentSeverity.MEDIUM,
-                "data": event.data
-            }
-        return None
-
-    elif event.type == EventType.DEVICE_OFFLINE:
-        # Можемо вважати втрату зв'язку з критичними пристроями (наприклад, димовими детекторами) як інцидент
-        device_type = event.device.type
-        if device_type in ["smoke_detector", "water_leak_sensor"]:
-            return {
-                "title": f"{device_type.replace('_', ' ').title()} is offline",
-                "description": f"Lost connection with {event.device.name} in {event.device.location or 'unknown location'}",
-                "severity": IncidentSeverity.LOW,
-                "data": event.data
-            }
-        return None
-
-    return None
+    return evaluate_event(event)
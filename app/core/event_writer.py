@@ -0,0 +1,192 @@
+import asyncio
+import datetime
+import logging
+from typing import List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.device import Device
+from app.models.event import Event, EventType
+from app.schemas.event import extract_value
+from app.core.versions import bump_space_versions
+from app.core.stream import publish_events
+
+logger = logging.getLogger(__name__)
+
+# Позначка в черзі буфера, після якої фонова задача дописує решту черги і завершується
+_STOP = object()
+
+
+class EventWriteBuffer:
+    """
+    Буфер групового запису подій.
+    Запити кладуть події в чергу, а фонова задача записує їх одним multi-row INSERT
+    і однією транзакцією. Кожен запит отримує відповідь лише після коміту його рядка.
+    """
+
+    def __init__(self, max_batch: int, max_wait: float):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        if self.running:
+            return
+        # Обмежена черга дає зворотний тиск, якщо база даних не встигає
+        self._queue = asyncio.Queue(maxsize=self.max_batch * 4)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        # Задача не скасовується: скасування посеред запису могло б записати пакет двічі.
+        # Пакет, що вже записується, завершується, а після нього записується решта черги
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        # Події, додані в чергу вже після зупинки задачі, не буде записано
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Event write buffer is stopped"))
+
+    async def submit(self, row: dict) -> Event:
+        """
+        Додає рядок події (див. event_row) в буфер і чекає, поки його буде записано в базу даних.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not (stopping and self._queue.empty()):
+            batch = []
+            deadline = None
+            while len(batch) < self.max_batch:
+                if stopping:
+                    # Після позначки зупинки дописуємо лише те, що вже потрапило в буфер
+                    if self._queue.empty():
+                        break
+                    item = self._queue.get_nowait()
+                elif deadline is None:
+                    item = await self._queue.get()
+                    deadline = loop.time() + self.max_wait
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        rows = [row for row, _ in batch]
+        try:
+            events = await self._write(rows)
+        except (IntegrityError, DataError):
+            # Один некоректний рядок (наприклад, пристрій видалено між запитом і записом)
+            # скасовує весь INSERT; записуємо рядки поодинці, щоб помилку отримав лише його запит
+            logger.warning("Buffered batch of %d events was rejected, retrying one by one", len(rows))
+            for item in batch:
+                await self._flush_one(item)
+            return
+        except Exception as exc:
+            logger.exception("Failed to write %d buffered events", len(rows))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), event in zip(batch, events):
+            if not future.done():
+                future.set_result(event)
+
+    async def _flush_one(self, item: tuple):
+        row, future = item
+        try:
+            event = (await self._write([row]))[0]
+        except Exception as exc:
+            logger.warning("Failed to write buffered event for device %s: %s", row.get("device_id"), exc)
+            if not future.done():
+                future.set_exception(exc)
+            return
+        if not future.done():
+            future.set_result(event)
+
+    @staticmethod
+    async def _write(rows: List[dict]) -> List[Event]:
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(write_events, rows)
+
+
+def event_row(event_type: EventType, data: Optional[dict], device_id: int, space_id: Optional[int]) -> dict:
+    """
+    Формує рядок для вставки в events; числовий показник переноситься в колонки value і unit.
+    """
+    value, unit = extract_value(event_type, data)
+    return {
+        "type": event_type, "data": data, "value": value, "unit": unit,
+        "device_id": device_id, "space_id": space_id
+    }
+
+
+def write_events(db: Session, rows: List[dict]) -> List[Event]:
+    """
+    Записує пакет подій одним INSERT і оновлює заряд батареї пристроїв в тій самій транзакції.
+    """
+    inserted = db.execute(
+        insert(Event).returning(Event.id, Event.created_at, sort_by_parameter_order=True),
+        rows
+    ).all()
+
+    # Для кожного пристрою зберігаємо лише останнє значення заряду з пакета
+    battery_updates = {}
+    now = datetime.datetime.now()
+    for row in rows:
+        if row["data"] and row["data"].get('battery', None):
+            battery_updates[row["device_id"]] = {
+                "id": row["device_id"],
+                "battery_level": row["data"].get('battery'),
+                "last_seen": now,
+            }
+    if battery_updates:
+        db.execute(update(Device), list(battery_updates.values()))
+    db.commit()
+    bump_space_versions(db, [row["space_id"] for row in rows])
+
+    events = [
+        Event(id=event_id, created_at=created_at, processed=False, **row)
+        for row, (event_id, created_at) in zip(rows, inserted)
+    ]
+    publish_events(events)
+    return events
+
+
+event_write_buffer = EventWriteBuffer(
+    max_batch=settings.EVENT_GROUP_COMMIT_MAX_BATCH,
+    max_wait=settings.EVENT_GROUP_COMMIT_MAX_WAIT_MS / 1000
+)
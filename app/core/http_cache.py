@@ -0,0 +1,19 @@
+import hashlib
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+
+def etag_response(request: Request, payload: BaseModel) -> Response:
+    """
+    Серіалізує відповідь і додає ETag з хешем тіла. Якщо клієнт надіслав той самий
+    ETag в If-None-Match, повертається 304 без тіла.
+    """
+    body = payload.model_dump_json().encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
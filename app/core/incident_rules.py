@@ -0,0 +1,217 @@
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.models.device import Device, DeviceType
+from app.models.event import Event, EventType
+from app.models.incident import IncidentSeverity
+
+
+class IncidentRule(NamedTuple):
+    name: str
+    event_type: EventType
+    title: str
+    severity: IncidentSeverity
+    template: str
+    # Назва показника, значення якого (Event.value) порівнюється з порогами
+    metric: Optional[str] = None
+    # Ключі порогів в Device.config; значення за замовчуванням беруться з DEFAULT_THRESHOLDS
+    above: Optional[str] = None
+    below: Optional[str] = None
+    # Якщо задано, правило діє лише для пристроїв цих типів
+    device_types: Tuple[DeviceType, ...] = ()
+
+
+class CompiledRule(NamedTuple):
+    rule: IncidentRule
+    high: Optional[float]
+    low: Optional[float]
+    title: str
+    context: dict
+    # Кількість послідовних спрацювань, після якої відкривається інцидент
+    debounce: int
+
+
+DEFAULT_THRESHOLDS = {
+    "max_temperature": 35.0,
+    "min_temperature": 5.0,
+    "max_humidity": 80.0,
+    "min_humidity": 20.0,
+}
+
+RULES = [
+    IncidentRule(
+        name="smoke_detected",
+        event_type=EventType.SMOKE_DETECTED,
+        title="Smoke detected",
+        severity=IncidentSeverity.HIGH,
+        template="Smoke was detected by device {device} in {location}",
+    ),
+    IncidentRule(
+        name="water_leak_detected",
+        event_type=EventType.WATER_LEAK_DETECTED,
+        title="Water leak detected",
+        severity=IncidentSeverity.MEDIUM,
+        template="Water leak was detected by device {device} in {location}",
+    ),
+    IncidentRule(
+        name="high_temperature",
+        event_type=EventType.TEMPERATURE,
+        title="High temperature detected",
+        severity=IncidentSeverity.MEDIUM,
+        template="Temperature of {value:g}°C was detected by device {device} in {location}",
+        metric="temperature",
+        above="max_temperature",
+    ),
+    IncidentRule(
+        name="low_temperature",
+        event_type=EventType.TEMPERATURE,
+        title="Low temperature detected",
+        severity=IncidentSeverity.MEDIUM,
+        template="Temperature of {value:g}°C was detected by device {device} in {location}",
+        metric="temperature",
+        below="min_temperature",
+    ),
+    IncidentRule(
+        name="high_humidity",
+        event_type=EventType.HUMIDITY,
+        title="High humidity detected",
+        severity=IncidentSeverity.MEDIUM,
+        template="Humidity: {value:g}% was detected by device {device} in {location}",
+        metric="humidity",
+        above="max_humidity",
+    ),
+    IncidentRule(
+        name="low_humidity",
+        event_type=EventType.HUMIDITY,
+        title="Low humidity detected",
+        severity=IncidentSeverity.MEDIUM,
+        template="Humidity: {value:g}% was detected by device {device} in {location}",
+        metric="humidity",
+        below="min_humidity",
+    ),
+    IncidentRule(
+        name="device_offline",
+        event_type=EventType.DEVICE_OFFLINE,
+        title="{device_type} is offline",
+        severity=IncidentSeverity.LOW,
+        template="Lost connection with {device} in {location}",
+        device_types=(DeviceType.SMOKE_DETECTOR, DeviceType.WATER_LEAK_SENSOR),
+    ),
+]
+
+# Скомпільовані набори правил для кожного пристрою:
+# device_id -> (поля пристрою, з яких скомпільовано правила, {EventType: [CompiledRule]})
+device_rules_cache = TTLCache(
+    maxsize=settings.DEVICE_RULES_CACHE_SIZE,
+    ttl=settings.DEVICE_RULES_CACHE_TTL
+)
+
+
+def invalidate_device_rules(device_id: int):
+    # Лише звільняє запис у поточному процесі: застарілі правила інших процесів
+    # відкидає перевірка полів пристрою в get_device_rules
+    device_rules_cache.invalidate(device_id)
+
+
+def rule_inputs(device: Device) -> tuple:
+    # Поля пристрою, від яких залежать скомпільовані правила
+    return device.name, device.location, device.type, device.config
+
+
+def config_threshold(config: dict, key: str) -> float:
+    # Некоректне значення в Device.config (наприклад, збережене до перевірки схемою)
+    # замінюється порогом за замовчуванням, щоб не зупиняти обробку подій пристрою
+    try:
+        value = float(config.get(key, DEFAULT_THRESHOLDS[key]))
+    except (TypeError, ValueError):
+        return DEFAULT_THRESHOLDS[key]
+    return value if math.isfinite(value) else DEFAULT_THRESHOLDS[key]
+
+
+def config_debounce(config: dict) -> int:
+    try:
+        value = int(config.get("debounce_hits", settings.INCIDENT_DEBOUNCE_HITS))
+    except (TypeError, ValueError, OverflowError):
+        return settings.INCIDENT_DEBOUNCE_HITS
+    return value if value >= 1 else settings.INCIDENT_DEBOUNCE_HITS
+
+
+def compile_rules(device: Device) -> Dict[EventType, List[CompiledRule]]:
+    """
+    Компілює таблицю правил для пристрою з урахуванням порогів з Device.config.
+    """
+    config = device.config if isinstance(device.config, dict) else {}
+    context = {
+        "device": device.name,
+        "location": device.location or 'unknown location',
+        "device_type": device.type.value.replace('_', ' ').title() if device.type else "Device",
+    }
+
+    dispatch = {}
+    for rule in RULES:
+        if rule.device_types and device.type not in rule.device_types:
+            continue
+
+        high = config_threshold(config, rule.above) if rule.above else None
+        low = config_threshold(config, rule.below) if rule.below else None
+        # Debounce застосовується лише до порогових правил; дим чи протікання - одразу інцидент
+        debounce = config_debounce(config) if rule.metric else 1
+        compiled = CompiledRule(
+            rule=rule,
+            high=high,
+            low=low,
+            title=rule.title.format(**context),
+            context=context,
+            debounce=debounce,
+        )
+        dispatch.setdefault(rule.event_type, []).append(compiled)
+
+    return dispatch
+
+
+def get_device_rules(device: Device) -> Dict[EventType, List[CompiledRule]]:
+    # Пристрій завантажується разом з подією, тому запис кешу порівнюється з його поточними полями:
+    # зміну порогів в іншому процесі (API-воркер, app.worker) видно одразу, без очікування TTL.
+    # updated_at для цього не підходить - його змінює і кожне оновлення заряду батареї
+    inputs = rule_inputs(device)
+    cached = device_rules_cache.get(device.id)
+    if cached is not None and cached[0] == inputs:
+        return cached[1]
+    rules = compile_rules(device)
+    device_rules_cache.set(device.id, (inputs, rules))
+    return rules
+
+
+def evaluate_event(event: Event) -> Optional[dict]:
+    """
+    Перевіряє подію за скомпільованими правилами її пристрою.
+    Повертає дані першого правила, що спрацювало, або None.
+    """
+    if event.device is None:
+        return None
+
+    for compiled in get_device_rules(event.device).get(event.type, ()):
+        rule = compiled.rule
+        value = None
+        if rule.metric:
+            # Показник уже виділено з data в типізовану колонку під час запису події
+            value = event.value
+            if value is None:
+                continue
+            if compiled.high is not None and not value > compiled.high:
+                continue
+            if compiled.low is not None and not value < compiled.low:
+                continue
+
+        return {
+            "rule": rule.name,
+            "title": compiled.title,
+            "description": rule.template.format(value=value, **compiled.context),
+            "severity": rule.severity,
+            "data": event.data,
+            "debounce": compiled.debounce
+        }
+
+    return None
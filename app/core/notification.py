@@ -1,5 +1,6 @@
+import asyncio
 import logging
-from app.models.incident import Incident, IncidentSeverity
+from typing import List, NamedTuple
 
 logger = logging.getLogger(__name__)
 
@@ -24,38 +25,46 @@ def send_sms(phone_number: str, message: str):
     # У реальному проекті тут буде код для надсилання SMS
 
 
-def send_incident_notification(incident: Incident):
-    """
-    Надсилає сповіщення про інцидент користувачу.
-    """
-    # Отримуємо інформацію про простір та власника
-    space = incident.event.device.space
-    owner = space.owner
-
-    # Формуємо текст сповіщення
-    subject = f"[{incident.severity.name}] {incident.title} in {space.name}"
-    body = f"""
-    Incident details:
-    -----------------
-    Description: {incident.description}
-    Severity: {incident.severity.name}
-    Location: {incident.event.device.location or 'Unknown location'}
-    Device: {incident.event.device.name}
-    Time: {incident.created_at}
-
-    Please check your dashboard for more details.
-    """
-
-    # Надсилаємо сповіщення залежно від налаштувань користувача та серйозності інциденту
-    # Тут можна додати логіку для вибору способу сповіщення на основі серйозності інциденту
-    if incident.severity in [IncidentSeverity.HIGH, IncidentSeverity.CRITICAL]:
-        # Для серйозних інцидентів надсилаємо і email, і SMS
-        if owner.email:
-            send_email(owner.email, subject, body)
-        if owner.phone:
-            message = f"{incident.severity.name}: {incident.title} in {space.name} at {incident.event.device.location or 'unknown location'}"
-            send_sms(owner.phone, message)
-    else:
-        # Для менш серйозних інцидентів надсилаємо лише email
-        if owner.email:
-            send_email(owner.email, subject, body)
+class Notification(NamedTuple):
+    recipient: str
+    subject: str
+    body: str
+
+
+class NotificationChannel:
+    """
+    Канал доставки сповіщень. Диспетчер передає каналу всі повідомлення одного циклу розсилки.
+    """
+    name = "base"
+
+    async def send_batch(self, notifications: List[Notification]):
+        raise NotImplementedError
+
+
+class EmailChannel(NotificationChannel):
+    name = "email"
+
+    async def send_batch(self, notifications: List[Notification]):
+        for notification in notifications:
+            await asyncio.to_thread(send_email, notification.recipient, notification.subject, notification.body)
+
+
+class SmsChannel(NotificationChannel):
+    name = "sms"
+
+    async def send_batch(self, notifications: List[Notification]):
+        for notification in notifications:
+            await asyncio.to_thread(send_sms, notification.recipient, notification.body)
+
+
+class InMemoryChannel(NotificationChannel):
+    """
+    Канал для тестів: зберігає надіслані повідомлення в пам'яті.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.sent: List[Notification] = []
+
+    async def send_batch(self, notifications: List[Notification]):
+        self.sent.extend(notifications)
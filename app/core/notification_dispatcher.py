@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.device import Device
+from app.models.incident import Incident, IncidentSeverity
+from app.models.space import Space
+from app.models.user import User
+from app.core.notification import Notification, NotificationChannel, EmailChannel, SmsChannel
+
+logger = logging.getLogger(__name__)
+
+URGENT_SEVERITIES = (IncidentSeverity.HIGH, IncidentSeverity.CRITICAL)
+
+
+class IncidentNotice(NamedTuple):
+    incident_id: int
+    title: str
+    description: Optional[str]
+    severity: IncidentSeverity
+    created_at: Optional[datetime]
+    device_name: str
+    location: Optional[str]
+    space_name: str
+    email: Optional[str]
+    phone: Optional[str]
+
+
+class RecipientState:
+    def __init__(self):
+        self.pending: List[IncidentNotice] = []
+        self.first_pending_at = 0.0
+        self.last_sent_at = -math.inf
+
+
+class NotificationDispatcher:
+    """
+    Диспетчер сповіщень про інциденти.
+    Працює у власному потоці з окремим циклом asyncio, тому повільні SMTP чи SMS
+    провайдери не затримують обробку подій. Отримувачі визначаються одним запитом
+    на пакет інцидентів, а повідомлення надсилаються пакетами для кожного каналу.
+    Одному отримувачу в каналі надсилається не більше одного повідомлення за
+    NOTIFICATION_MIN_INTERVAL секунд; інциденти, що накопичилися за цей час,
+    об'єднуються в дайджест. Інциденти HIGH та CRITICAL надсилаються без затримки.
+    """
+
+    def __init__(self, channels: Dict[str, NotificationChannel], min_interval: float,
+                 batch_window: float, queue_size: int):
+        self.channels = channels
+        self.min_interval = min_interval
+        self.batch_window = batch_window
+        self.queue_size = queue_size
+        self._states: Dict[tuple, RecipientState] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="notifications", daemon=True)
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    def stop(self, timeout: float = 10):
+        with self._lock:
+            if not self.running:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result(timeout)
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout)
+                self._loop.close()
+                self._thread = None
+                self._loop = None
+
+    def enqueue(self, incident_ids: List[int]):
+        """
+        Ставить інциденти в чергу на сповіщення. Безпечно викликати з будь-якого потоку.
+        """
+        if not incident_ids:
+            return
+        if not self.running:
+            self.start()
+        self._loop.call_soon_threadsafe(self._put, list(incident_ids))
+
+    def _put(self, incident_ids: List[int]):
+        try:
+            self._queue.put_nowait(incident_ids)
+        except asyncio.QueueFull:
+            logger.warning(f"Notification queue is full, dropping {len(incident_ids)} incidents")
+
+    async def _start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def _stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        # Дочитуємо чергу і надсилаємо все накопичене
+        incident_ids = []
+        while not self._queue.empty():
+            incident_ids.extend(self._queue.get_nowait())
+        if incident_ids:
+            await self._collect(incident_ids)
+        await self._flush(force=True)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Раз на секунду прокидаємось, щоб надіслати дайджести, для яких минув інтервал
+            try:
+                incident_ids = await asyncio.wait_for(self._queue.get(), timeout=1)
+            except asyncio.TimeoutError:
+                incident_ids = []
+
+            # Збираємо інциденти, що надійшли протягом вікна пакетування
+            deadline = loop.time() + self.batch_window
+            while incident_ids:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    incident_ids.extend(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                if incident_ids:
+                    await self._collect(incident_ids)
+                await self._flush()
+            except Exception:
+                logger.exception("Failed to dispatch incident notifications")
+
+    async def _collect(self, incident_ids: List[int]):
+        notices = await asyncio.to_thread(load_notices, incident_ids)
+        now = time.monotonic()
+        for notice in notices:
+            recipients = []
+            if notice.email:
+                recipients.append(("email", notice.email))
+            if notice.phone and notice.severity in URGENT_SEVERITIES:
+                recipients.append(("sms", notice.phone))
+
+            for key in recipients:
+                state = self._states.setdefault(key, RecipientState())
+                if not state.pending:
+                    state.first_pending_at = now
+                state.pending.append(notice)
+
+    async def _flush(self, force: bool = False):
+        now = time.monotonic()
+        outgoing: Dict[str, List[Notification]] = {}
+        for key, state in list(self._states.items()):
+            if not state.pending:
+                # Забуваємо отримувачів, для яких обмеження частоти вже не діє
+                if now - state.last_sent_at >= self.min_interval:
+                    del self._states[key]
+                continue
+
+            urgent = any(notice.severity in URGENT_SEVERITIES for notice in state.pending)
+            if not (force or urgent or now - state.last_sent_at >= self.min_interval):
+                continue
+
+            channel_name, recipient = key
+            outgoing.setdefault(channel_name, []).append(
+                build_notification(channel_name, recipient, state.pending, now - state.first_pending_at)
+            )
+            state.pending = []
+            state.last_sent_at = now
+
+        results = await asyncio.gather(
+            *(self.channels[name].send_batch(notifications)
+              for name, notifications in outgoing.items() if name in self.channels),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Notification channel failed: {result}")
+
+
+def load_notices(incident_ids: List[int]) -> List[IncidentNotice]:
+    """
+    Завантажує інциденти разом з пристроєм, простором і власником одним запитом.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            Incident.id, Incident.title, Incident.description, Incident.severity, Incident.created_at,
+            Device.name, Device.location, Space.name, User.email, User.phone
+        ).join(
+            Device, Incident.device_id == Device.id
+        ).join(
+            Space, Device.space_id == Space.id
+        ).join(
+            User, Space.owner_id == User.id
+        ).filter(
+            Incident.id.in_(incident_ids)
+        ).order_by(Incident.id).all()
+    finally:
+        db.close()
+
+    return [IncidentNotice(*row) for row in rows]
+
+
+def build_notification(channel_name: str, recipient: str, notices: List[IncidentNotice],
+                       period: float) -> Notification:
+    if len(notices) == 1:
+        notice = notices[0]
+        location = notice.location or 'unknown location'
+        subject = f"[{notice.severity.name}] {notice.title} in {notice.space_name}"
+        if channel_name == "sms":
+            return Notification(recipient, subject, f"{notice.severity.name}: {notice.title} in {notice.space_name} at {location}")
+
+        body = f"""
+    Incident details:
+    -----------------
+    Description: {notice.description}
+    Severity: {notice.severity.name}
+    Location: {notice.location or 'Unknown location'}
+    Device: {notice.device_name}
+    Time: {notice.created_at}
+
+    Please check your dashboard for more details.
+    """
+        return Notification(recipient, subject, body)
+
+    # Дайджест: "12 incidents in Warehouse A in the last 5 minutes"
+    spaces = sorted({notice.space_name for notice in notices})
+    where = spaces[0] if len(spaces) == 1 else f"{len(spaces)} spaces"
+    minutes = max(1, math.ceil(period / 60))
+    subject = f"{len(notices)} incidents in {where} in the last {minutes} minute{'s' if minutes > 1 else ''}"
+    if channel_name == "sms":
+        return Notification(recipient, subject, subject)
+
+    lines = [
+        f"    [{notice.severity.name}] {notice.title} - {notice.device_name}, "
+        f"{notice.location or 'unknown location'} ({notice.space_name}) at {notice.created_at}"
+        for notice in notices
+    ]
+    body = "\n" + "\n".join(lines) + "\n\n    Please check your dashboard for more details.\n"
+    return Notification(recipient, subject, body)
+
+
+notification_dispatcher = NotificationDispatcher(
+    channels={"email": EmailChannel(), "sms": SmsChannel()},
+    min_interval=settings.NOTIFICATION_MIN_INTERVAL,
+    batch_window=settings.NOTIFICATION_BATCH_WINDOW_MS / 1000,
+    queue_size=settings.NOTIFICATION_QUEUE_SIZE
+)
@@ -0,0 +1,36 @@
+from typing import FrozenSet
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.models.space import Space
+
+# Кеш user_id -> множина ID просторів користувача. Власник простору не змінюється,
+# тому кеш скидається лише при створенні і видаленні простору. Простір, створений
+# в іншому процесі, знаходиться перечитуванням множини при промаху.
+space_owner_cache = TTLCache(
+    maxsize=settings.SPACE_OWNER_CACHE_SIZE,
+    ttl=settings.SPACE_OWNER_CACHE_TTL
+)
+
+
+def load_owned_space_ids(db: Session, user_id: int) -> FrozenSet[int]:
+    space_ids = frozenset(space_id for space_id, in db.query(Space.id).filter(Space.owner_id == user_id))
+    space_owner_cache.set(user_id, space_ids)
+    return space_ids
+
+
+def owns_space(db: Session, user_id: int, space_id: int) -> bool:
+    """
+    Чи належить простір користувачу. Відповідає з пам'яті, а до бази даних
+    звертається лише при першому запиті користувача або якщо простору немає в кеші.
+    """
+    space_ids = space_owner_cache.get(user_id)
+    if space_ids is not None and space_id in space_ids:
+        return True
+    return space_id in load_owned_space_ids(db, user_id)
+
+
+def invalidate_space_owner(user_id: int):
+    space_owner_cache.invalidate(user_id)
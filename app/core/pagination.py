@@ -0,0 +1,46 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), item_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, item_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query, model, skip: int, limit: int, after: Optional[str], response: Response) -> list:
+    """
+    Повертає сторінку записів, відсортованих від найновіших (created_at, id).
+    З курсором after використовується seek-умова (created_at, id) < курсор, яку
+    обслуговує складений індекс; skip залишено лише для зворотної сумісності.
+    Курсор наступної сторінки повертається в заголовку X-Next-Cursor.
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+
+    if after:
+        created_at, item_id = decode_cursor(after)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, item_id))
+    elif skip:
+        query = query.offset(skip)
+
+    items = query.limit(limit).all()
+    if items and len(items) == limit:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return items
@@ -0,0 +1,49 @@
+import time
+
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def recently_wrote(connection: HTTPConnection) -> bool:
+    """
+    Чи змінював клієнт дані протягом останніх READ_YOUR_WRITES_WINDOW секунд (за cookie).
+    """
+    try:
+        last_write = float(connection.cookies.get(settings.READ_YOUR_WRITES_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - last_write < settings.READ_YOUR_WRITES_WINDOW
+
+
+class ReadYourWritesMiddleware:
+    """
+    Після успішного запиту, що змінює дані, ставить cookie з часом зміни.
+    Поки cookie діє, get_read_db читає з основної бази, а не з репліки, що може відставати.
+    Запити хабів (з X-API-Key) пропускаються - хаби не читають дані користувачів.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+        if HTTPConnection(scope).headers.get("x-api-key"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{settings.READ_YOUR_WRITES_COOKIE}={time.time():.3f}; "
+                    f"Max-Age={settings.READ_YOUR_WRITES_WINDOW}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,36 @@
+from typing import Iterable
+
+from app.models.event import Event
+from app.models.incident import Incident
+from app.schemas.event import EventOut
+from app.schemas.incident import IncidentOut
+from app.core.broker import stream_broker
+
+
+def space_channel(space_id: int) -> str:
+    return f"space:{space_id}"
+
+
+def publish(kind: str, space_id: int, schema, obj):
+    channel = space_channel(space_id)
+    if space_id is None or not stream_broker.has_subscribers(channel):
+        return
+    stream_broker.publish(channel, {"type": kind, "data": schema.model_validate(obj, from_attributes=True).model_dump(mode="json")})
+
+
+def publish_events(events: Iterable[Event]):
+    """
+    Надсилає збережені події підписникам стріму їх простору.
+    Викликається лише після коміту, щоб клієнти не отримали подію, якої немає в базі даних.
+    Серіалізація відбувається, лише якщо простір хтось слухає.
+    """
+    for event in events:
+        publish("event", event.space_id, EventOut, event)
+
+
+def publish_incidents(incidents: Iterable[Incident]):
+    """
+    Надсилає нові або змінені інциденти підписникам стріму їх простору (після коміту).
+    """
+    for incident in incidents:
+        publish("incident", incident.space_id, IncidentOut, incident)
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.event import Event, EventType
+from app.models.telemetry import TelemetryBucket, TelemetryRollup
+
+# Типи подій, для яких ведуться агрегати, і назва показника в event.data
+TELEMETRY_METRICS = {
+    EventType.TEMPERATURE: "temperature",
+    EventType.HUMIDITY: "humidity",
+}
+
+BUCKET_SIZES = {
+    TelemetryBucket.MINUTE: timedelta(minutes=1),
+    TelemetryBucket.HOUR: timedelta(hours=1),
+    TelemetryBucket.DAY: timedelta(days=1),
+}
+
+
+def bucket_retention(bucket: TelemetryBucket) -> Optional[timedelta]:
+    if bucket == TelemetryBucket.MINUTE:
+        return timedelta(days=settings.TELEMETRY_MINUTE_RETENTION_DAYS)
+    if bucket == TelemetryBucket.HOUR:
+        return timedelta(days=settings.TELEMETRY_HOUR_RETENTION_DAYS)
+    return None
+
+
+def truncate(moment: datetime, bucket: TelemetryBucket) -> datetime:
+    """
+    Повертає початок інтервалу, до якого належить момент часу (межі інтервалів - за UTC).
+    """
+    moment = moment.astimezone(timezone.utc)
+    if bucket == TelemetryBucket.MINUTE:
+        return moment.replace(second=0, microsecond=0)
+    if bucket == TelemetryBucket.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def collect_rollups(events: List[Event]) -> Dict[tuple, list]:
+    """
+    Агрегує значення показників пакета подій за всіма рівнями інтервалів.
+    Повертає (device_id, metric, bucket, bucket_start) -> [count, sum, min, max].
+    """
+    rollups = {}
+    for event in events:
+        value = event.value
+        if event.type not in TELEMETRY_METRICS or value is None or event.device_id is None or event.created_at is None:
+            continue
+        metric = TELEMETRY_METRICS[event.type]
+        for bucket in TelemetryBucket:
+            key = (event.device_id, metric, bucket, truncate(event.created_at, bucket))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollups[key] = [1, value, value, value]
+            else:
+                rollup[0] += 1
+                rollup[1] += value
+                rollup[2] = min(rollup[2], value)
+                rollup[3] = max(rollup[3], value)
+    return rollups
+
+
+def update_rollups(db: Session, events: List[Event]) -> int:
+    """
+    Доповнює агрегати телеметрії подіями пакета одним INSERT ... ON CONFLICT DO UPDATE.
+    Викликається в транзакції обробки подій, тому агрегати змінюються разом з позначкою processed.
+    Повертає кількість змінених агрегатів.
+    """
+    rollups = collect_rollups(events)
+    if not rollups:
+        return 0
+
+    # Сортування ключів задає однаковий порядок блокування рядків для паралельних воркерів
+    rows = [
+        {
+            "device_id": device_id, "metric": metric, "bucket": bucket, "bucket_start": bucket_start,
+            "count": count, "sum": total, "min": low, "max": high
+        }
+        for (device_id, metric, bucket, bucket_start), (count, total, low, high)
+        in sorted(rollups.items(), key=lambda item: (item[0][0], item[0][1], item[0][2].name, item[0][3]))
+    ]
+
+    statement = insert(TelemetryRollup).values(rows)
+    excluded = statement.excluded
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[
+            TelemetryRollup.device_id, TelemetryRollup.metric,
+            TelemetryRollup.bucket, TelemetryRollup.bucket_start
+        ],
+        set_={
+            "count": TelemetryRollup.count + excluded["count"],
+            "sum": TelemetryRollup.sum + excluded["sum"],
+            "min": func.least(TelemetryRollup.min, excluded["min"]),
+            "max": func.greatest(TelemetryRollup.max, excluded["max"]),
+        }
+    ))
+    return len(rows)
+
+
+def choose_bucket(start: datetime, end: datetime, now: datetime) -> TelemetryBucket:
+    """
+    Обирає найдрібніший рівень агрегатів, який ще зберігається для початку діапазону
+    і дає не більше TELEMETRY_MAX_POINTS точок.
+    """
+    for bucket in TelemetryBucket:
+        retention = bucket_retention(bucket)
+        if retention is not None and start < now - retention:
+            continue
+        if (end - start) / BUCKET_SIZES[bucket] <= settings.TELEMETRY_MAX_POINTS:
+            return bucket
+    return TelemetryBucket.DAY
+
+
+def read_rollups(db: Session, device_id: int, metric: str, bucket: TelemetryBucket,
+                 start: datetime, end: datetime) -> List[Tuple]:
+    return db.query(
+        TelemetryRollup.bucket_start,
+        TelemetryRollup.count,
+        (TelemetryRollup.sum / TelemetryRollup.count).label("avg"),
+        TelemetryRollup.min,
+        TelemetryRollup.max
+    ).filter(
+        TelemetryRollup.device_id == device_id,
+        TelemetryRollup.metric == metric,
+        TelemetryRollup.bucket == bucket,
+        TelemetryRollup.bucket_start >= truncate(start, bucket),
+        TelemetryRollup.bucket_start < end
+    ).order_by(TelemetryRollup.bucket_start).all()
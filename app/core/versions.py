@@ -0,0 +1,45 @@
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.space import Space
+
+
+def bump_space_versions(db: Session, space_ids: Iterable[Optional[int]]):
+    """
+    Збільшує маркер версії просторів окремою короткою транзакцією; по маркеру умовні
+    GET-запити відповідають 304 без читання рядків. Викликається після коміту операцій,
+    що змінюють пристрої, хаби, події чи інциденти простору, тому рядок spaces блокується
+    лише на час цього UPDATE, а не всієї транзакції запису. Клієнт, який встиг прочитати
+    нові дані зі старим маркером, після оновлення маркера отримає їх повторно.
+    """
+    space_ids = sorted({space_id for space_id in space_ids if space_id is not None})
+    if not space_ids:
+        return
+    # Рядки блокуються в порядку id, щоб паралельні оновлення кількох просторів не чекали одне на одного взаємно
+    locked = select(Space.id).where(Space.id.in_(space_ids)).order_by(Space.id).with_for_update().subquery()
+    # updated_at описує зміну самого простору, тому залишаємо його без змін. clock_timestamp() замість now()
+    # і GREATEST не дають modified_at зменшитися, якщо транзакція з ранішим часом початку оновить маркер пізніше
+    db.execute(update(Space).where(Space.id == locked.c.id).values(
+        version=Space.version + 1,
+        modified_at=func.greatest(Space.modified_at, func.clock_timestamp()),
+        updated_at=Space.updated_at
+    ).execution_options(synchronize_session=False))
+    db.commit()
+
+
+def format_http_date(moment: datetime) -> str:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
@@ -1,16 +1,131 @@
+import threading
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+
+class PoolMetrics:
+    """
+    Статистика очікування з'єднань пулу: кількість видач, сумарний і максимальний
+    час очікування та кількість тайм-аутів (помилка "QueuePool limit ... overflow").
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timed_out: bool):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def stats(self, pool) -> dict:
+        with self._lock:
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / max(self.checkouts + self.timeouts, 1) * 1000, 3),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class MeasuredPoolMixin:
+    """
+    Вимірює час, за який пул видає з'єднання (включно з очікуванням вільного).
+    Метрики спільні для пулу і його копій, які створює engine.dispose().
+    """
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start, timed_out=False)
+        return connection
+
+
+def measured_pool(base):
+    return type(f"Measured{base.__name__}", (MeasuredPoolMixin, base), {"metrics": PoolMetrics()})
+
+
+def engine_options(connect_args: dict) -> dict:
+    return dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args if settings.DB_STATEMENT_TIMEOUT_MS > 0 else {},
+    )
+
+
+# Синхронний рушій - для sync-ендпоінтів (виконуються в пулі потоків), воркера і CLI
+engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=measured_pool(QueuePool),
+    **engine_options({"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"})
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Рушій репліки для читання (лише якщо задано READ_REPLICA_URL), див. app.api.deps.get_read_db
+read_engine = create_engine(
+    settings.READ_REPLICA_URL,
+    poolclass=measured_pool(QueuePool),
+    **engine_options({"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"})
+) if settings.READ_REPLICA_URL else None
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine else None
+
+# Асинхронний рушій - для async-ендпоінтів, щоб запити до бази даних не блокували цикл подій
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=measured_pool(AsyncAdaptedQueuePool),
+    **engine_options({"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}})
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+
+def pool_stats() -> dict:
+    stats = {
+        "sync": engine.pool.metrics.stats(engine.pool),
+        "async": async_engine.pool.metrics.stats(async_engine.pool),
+    }
+    if read_engine is not None:
+        stats["replica"] = read_engine.pool.metrics.stats(read_engine.pool)
+    return stats
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
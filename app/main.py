@@ -1,13 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import logging
 
-from app.api import auth, users, spaces, hubs, devices, events, incidents
+from app.api import auth, users, spaces, hubs, devices, events, incidents, telemetry, stream, metrics
 from app.config import settings
-from app.database import Base, engine
+from app.core.event_writer import event_write_buffer
+from app.core.notification_dispatcher import notification_dispatcher
+from app.core.broker import stream_broker
+from app.core.replica import ReadYourWritesMiddleware
+from app.database import read_engine
 
-# Створюємо таблиці в базі даних (в виробничому середовищі краще використовувати міграції Alembic)
-Base.metadata.create_all(bind=engine)
+# Схему бази даних створюють і оновлюють міграції Alembic: alembic upgrade head
 
 # Налаштування логування
 logging.basicConfig(
@@ -30,8 +36,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Заголовки пагінації та умовних запитів мають бути доступні браузерним клієнтам
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
+if read_engine is not None:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    try:
+        return await request_validation_exception_handler(request, exc)
+    except ValueError:
+        # NaN або Infinity з тіла запиту не можна повернути в JSON, тому вхідні дані в помилках не повторюються
+        errors = [{key: value for key, value in error.items() if key not in ("input", "ctx")} for error in exc.errors()]
+        return JSONResponse(status_code=422, content={"detail": errors})
+
+
+@app.on_event("startup")
+async def startup():
+    notification_dispatcher.start()
+    stream_broker.start()
+    if settings.EVENT_GROUP_COMMIT_ENABLED:
+        event_write_buffer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await event_write_buffer.stop()
+    notification_dispatcher.stop()
+    stream_broker.stop()
+
+
 app.include_router(auth.router, prefix="/api", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(spaces.router, prefix="/api/spaces", tags=["spaces"])
@@ -39,6 +76,9 @@ app.include_router(hubs.router, prefix="/api/spaces", tags=["hubs"])
 app.include_router(devices.router, prefix="/api/spaces", tags=["devices"])
 app.include_router(events.router, prefix="/api/spaces", tags=["events"])
 app.include_router(incidents.router, prefix="/api/spaces", tags=["incidents"])
+app.include_router(telemetry.router, prefix="/api/spaces", tags=["telemetry"])
+app.include_router(stream.router, prefix="/api/spaces", tags=["stream"])
+app.include_router(metrics.router, prefix="/api", tags=["metrics"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+import argparse
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.config import settings
+from app.database import engine
+from app.models.space import SpaceType
+from app.models.telemetry import TelemetryBucket
+from app.core.telemetry import bucket_retention
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+BOUND_PATTERN = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+DEFAULT_PARTITION = "events_default"
+# Кількість просторів в одному пакетному DELETE
+SPACE_BATCH_SIZE = 1000
+
+
+class Partition(NamedTuple):
+    name: str
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def parse_bound(value: str) -> Optional[datetime]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def get_event_partitions(conn: Connection) -> List[Partition]:
+    rows = conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'events'::regclass
+    """)).all()
+
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_PATTERN.search(bound or "")
+        if match:
+            partitions.append(Partition(name, parse_bound(match.group(1)), parse_bound(match.group(2))))
+    return sorted(partitions, key=lambda partition: partition.upper or datetime.max.replace(tzinfo=timezone.utc))
+
+
+def create_future_partitions(conn: Connection, partitions: List[Partition], months_ahead: int):
+    """
+    Створює місячні секції events від поточного місяця на months_ahead місяців вперед.
+    """
+    covered_until = max((p.upper.date() for p in partitions if p.upper), default=None)
+    start = date.today().replace(day=1)
+    for offset in range(months_ahead + 1):
+        month = add_months(start, offset)
+        if covered_until and month < covered_until:
+            continue
+        create_partition(conn, month)
+        logger.info(f"Partition events_{month:%Y_%m} is ready")
+
+
+def create_partition(conn: Connection, month: date):
+    """
+    Створює місячну секцію. Якщо події цього місяця вже потрапили в секцію за замовчуванням,
+    PostgreSQL не дозволить створити секцію, тому вони переносяться в неї в тій самій транзакції.
+    """
+    name = f"events_{month:%Y_%m}"
+    bounds = {"lower": month, "upper": add_months(month, 1)}
+    has_default = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION}).scalar()
+    misplaced = has_default and conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :lower AND created_at < :upper)"
+    ), bounds).scalar()
+
+    if not misplaced:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF events "
+            f"FOR VALUES FROM ('{bounds['lower']}') TO ('{bounds['upper']}')"
+        ))
+        return
+
+    logger.warning(f"Moving events from {DEFAULT_PARTITION} to the new partition {name}")
+    conn.execute(text(f"ALTER TABLE events DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF events FOR VALUES FROM ('{bounds['lower']}') TO ('{bounds['upper']}')"
+    ))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :lower AND created_at < :upper "
+        f"RETURNING *) INSERT INTO events SELECT * FROM moved"
+    ), bounds)
+    conn.execute(text(f"ALTER TABLE events ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+def expire_partitions(conn: Connection, partitions: List[Partition], cutoff: datetime, detach_only: bool):
+    """
+    Від'єднує (і за замовчуванням видаляє) секції, всі рядки яких старші за cutoff.
+    Це O(1) операція на відміну від DELETE по всій таблиці.
+    """
+    for partition in partitions:
+        if partition.upper is None or partition.upper > cutoff:
+            continue
+        conn.execute(text(f"ALTER TABLE events DETACH PARTITION {partition.name}"))
+        if detach_only:
+            logger.info(f"Partition {partition.name} detached")
+        else:
+            conn.execute(text(f"DROP TABLE {partition.name}"))
+            logger.info(f"Partition {partition.name} dropped")
+
+
+def purge_space_type_events(conn: Connection, space_type: SpaceType, cutoff: datetime, batch_size: int) -> int:
+    """
+    Видаляє події просторів заданого типу, старші за cutoff, невеликими пакетами.
+    Потрібно лише для типів просторів, строк зберігання яких коротший за строк секцій.
+    Події відбираються за events.space_id через індекс (space_id, created_at, id), без JOIN.
+    """
+    space_ids = conn.execute(
+        text("SELECT id FROM spaces WHERE type = :space_type ORDER BY id"), {"space_type": space_type.name}
+    ).scalars().all()
+
+    deleted = 0
+    for start in range(0, len(space_ids), SPACE_BATCH_SIZE):
+        chunk = space_ids[start:start + SPACE_BATCH_SIZE]
+        while True:
+            result = conn.execute(text("""
+                DELETE FROM events WHERE (id, created_at) IN (
+                    SELECT e.id, e.created_at FROM events e
+                    WHERE e.space_id = ANY(:space_ids) AND e.created_at < :cutoff
+                    LIMIT :batch_size
+                )
+            """), {"space_ids": chunk, "cutoff": cutoff, "batch_size": batch_size})
+            conn.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+    return deleted
+
+
+def purge_telemetry_rollups(conn: Connection, now: datetime):
+    """
+    Видаляє хвилинні та годинні агрегати телеметрії, старші за їх строк зберігання.
+    """
+    for bucket in TelemetryBucket:
+        retention = bucket_retention(bucket)
+        if retention is None:
+            continue
+        result = conn.execute(
+            text("DELETE FROM telemetry_rollups WHERE bucket = :bucket AND bucket_start < :cutoff"),
+            {"bucket": bucket.name, "cutoff": now - retention}
+        )
+        conn.commit()
+        logger.info(f"Deleted {result.rowcount} expired {bucket.value} telemetry rollups")
+
+
+def recount_counters(conn: Connection):
+    """
+    Перераховує лічильники пристроїв і хабів, виправляючи можливі розбіжності.
+    Змінюються лише рядки, значення яких відрізняються.
+    """
+    spaces = conn.execute(text("""
+        UPDATE spaces SET device_count = counts.devices, hub_count = counts.hubs
+        FROM (
+            SELECT s.id,
+                   (SELECT count(*) FROM devices d WHERE d.space_id = s.id) AS devices,
+                   (SELECT count(*) FROM hubs h WHERE h.space_id = s.id) AS hubs
+            FROM spaces s
+        ) AS counts
+        WHERE spaces.id = counts.id
+          AND (spaces.device_count <> counts.devices OR spaces.hub_count <> counts.hubs)
+    """))
+    hubs = conn.execute(text("""
+        UPDATE hubs SET device_count = counts.devices
+        FROM (
+            SELECT h.id, (SELECT count(*) FROM devices d WHERE d.hub_id = h.id) AS devices
+            FROM hubs h
+        ) AS counts
+        WHERE hubs.id = counts.id AND hubs.device_count <> counts.devices
+    """))
+    conn.commit()
+    logger.info(f"Recounted counters of {spaces.rowcount} spaces and {hubs.rowcount} hubs")
+
+
+def run_maintenance(months_ahead: int, detach_only: bool, batch_size: int):
+    now = datetime.now(timezone.utc)
+    retention = {
+        space_type: settings.EVENT_RETENTION_DAYS_BY_SPACE_TYPE.get(space_type.name, settings.EVENT_RETENTION_DAYS)
+        for space_type in SpaceType
+    }
+    # Секція спільна для всіх просторів, тому її можна видалити лише після найдовшого строку зберігання
+    partition_cutoff = now - timedelta(days=max(retention.values()))
+
+    with engine.connect() as conn:
+        # Пакетні DELETE та операції з секціями довші за звичайні запити застосунку
+        conn.execute(text("SET statement_timeout = 0"))
+        conn.commit()
+
+        partitions = get_event_partitions(conn)
+        if partitions:
+            create_future_partitions(conn, partitions, months_ahead)
+            expire_partitions(conn, partitions, partition_cutoff, detach_only)
+            conn.commit()
+        else:
+            logger.warning("Table events is not partitioned, run 'alembic upgrade head' first")
+
+        for space_type, days in retention.items():
+            cutoff = now - timedelta(days=days)
+            if cutoff > partition_cutoff:
+                deleted = purge_space_type_events(conn, space_type, cutoff, batch_size)
+                logger.info(f"Deleted {deleted} expired events of {space_type.name} spaces")
+
+        purge_telemetry_rollups(conn, now)
+        recount_counters(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Safe Space events partition maintenance and retention")
+    parser.add_argument("--months-ahead", type=int, default=settings.EVENT_PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--detach-only", action="store_true", default=settings.EVENT_PARTITION_DETACH_ONLY)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    run_maintenance(args.months_ahead, args.detach_only, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean, JSON, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean, JSON, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -31,7 +31,7 @@ class Device(Base):
     battery_level = Column(Float)
     config = Column(JSON)
     last_seen = Column(DateTime(timezone=True))
-    hub_id = Column(Integer, ForeignKey("hubs.id"))
+    hub_id = Column(Integer, ForeignKey("hubs.id"), index=True)
     space_id = Column(Integer, ForeignKey("spaces.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -39,3 +39,8 @@ class Device(Base):
     hub = relationship("Hub", back_populates="devices")
     space = relationship("Space", back_populates="devices")
     events = relationship("Event", back_populates="device")
+
+    __table_args__ = (
+        # Пристрої простору з необов'язковим фільтром за типом (read_devices)
+        Index("ix_devices_space_id_type", "space_id", "type"),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.database import Base
+from app.models.event import EventType
+
+
+class DeviceState(Base):
+    """
+    Поточний стан пристрою: остання подія, останні значення показників і кількість
+    відкритих інцидентів. Оновлюється обробником подій, тому дашборду не потрібно
+    читати таблицю events.
+    """
+    __tablename__ = "device_state"
+
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    space_id = Column(Integer, ForeignKey("spaces.id"), index=True)
+    last_event_type = Column(Enum(EventType))
+    last_event_at = Column(DateTime(timezone=True))
+    # Останні значення показників: {"temperature": {"value": 21.5, "unit": "°C", "at": "..."}}
+    readings = Column(JSONB, nullable=False, default=dict, server_default="{}")
+    # Лічильники послідовних спрацювань порогових правил для debounce: {"temperature": {"rule": "...", "count": 2}}
+    debounce = Column(JSONB, nullable=False, default=dict, server_default="{}")
+    open_incident_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
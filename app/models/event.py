@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Boolean, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, JSON, Boolean, Enum, Index, false
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -22,14 +22,38 @@ class EventType(enum.Enum):
 
 
 class Event(Base):
+    # У PostgreSQL таблиця секціонована за created_at (міграція 0004), її первинний ключ - (id, created_at)
     __tablename__ = "events"
 
     id = Column(Integer, primary_key=True, index=True)
     type = Column(Enum(EventType), nullable=False)
     data = Column(JSON)
+    # Основний числовий показник з data (температура, вологість, заряд) та його одиниця виміру
+    value = Column(Float)
+    unit = Column(String)
     processed = Column(Boolean, default=False)
+    # Невдалі спроби обробки; після EVENT_MAX_ATTEMPTS подія отримує failed_at і більше не обробляється
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    failed_at = Column(DateTime(timezone=True))
     device_id = Column(Integer, ForeignKey("devices.id"))
+    # Копія Device.space_id для фільтрації подій простору без JOIN з devices.
+    # Без зовнішнього ключа: секціонована таблиця не підтримує NOT VALID обмеження,
+    # а перевірка всієї таблиці при міграції заблокувала б запис подій
+    space_id = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     device = relationship("Device", back_populates="events")
-    incident = relationship("Incident", back_populates="event", uselist=False)
+    incident = relationship(
+        "Incident", primaryjoin="Event.id == foreign(Incident.event_id)", back_populates="event", uselist=False
+    )
+
+    __table_args__ = (
+        # Складені індекси для курсорної пагінації (created_at, id)
+        Index("ix_events_created_at_id", "created_at", "id"),
+        Index("ix_events_device_id_created_at_id", "device_id", "created_at", "id"),
+        Index("ix_events_space_id_created_at_id", "space_id", "created_at", "id"),
+        # Фільтр за типом події в read_events
+        Index("ix_events_device_id_type_created_at_id", "device_id", "type", "created_at", "id"),
+        # Частковий індекс черги необроблених подій для app.worker
+        Index("ix_events_unprocessed_id", "id", postgresql_where=processed == false()),
+    )
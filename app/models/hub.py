@@ -15,7 +15,9 @@ class Hub(Base):
     is_active = Column(Boolean, default=True)
     last_connection = Column(DateTime(timezone=True))
     ip_address = Column(String)
-    space_id = Column(Integer, ForeignKey("spaces.id"))
+    space_id = Column(Integer, ForeignKey("spaces.id"), index=True)
+    # Лічильник пристроїв хаба (app.core.counters)
+    device_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -20,6 +20,10 @@ class IncidentSeverity(enum.Enum):
     CRITICAL = "critical"
 
 
+# Статуси відкритих інцидентів; для кожної пари (device_id, rule) може бути лише один такий інцидент
+OPEN_STATUSES = (IncidentStatus.NEW, IncidentStatus.ACKNOWLEDGED)
+
+
 class Incident(Base):
     __tablename__ = "incidents"
 
@@ -29,9 +33,31 @@ class Incident(Base):
     status = Column(Enum(IncidentStatus), default=IncidentStatus.NEW)
     severity = Column(Enum(IncidentSeverity), default=IncidentSeverity.MEDIUM)
     data = Column(JSON)
-    event_id = Column(Integer, ForeignKey("events.id"))
+    # Без зовнішнього ключа: первинний ключ секціонованої таблиці events - (id, created_at)
+    event_id = Column(Integer, index=True)
+    # Поля для об'єднання повторних спрацювань одного правила на одному пристрої
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="SET NULL"), index=True)
+    # Копія Device.space_id для фільтрації інцидентів простору без JOIN з events і devices
+    space_id = Column(Integer, ForeignKey("spaces.id"))
+    rule = Column(String)
+    hit_count = Column(Integer, default=1, nullable=False)
+    last_seen_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     resolved_at = Column(DateTime(timezone=True))
 
-    event = relationship("Event", back_populates="incident")
+    event = relationship("Event", primaryjoin="foreign(Incident.event_id) == Event.id", back_populates="incident")
+
+    __table_args__ = (
+        # Складені індекси для курсорної пагінації (created_at, id) з фільтром за статусом
+        Index("ix_incidents_created_at_id", "created_at", "id"),
+        Index("ix_incidents_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_incidents_space_id_created_at_id", "space_id", "created_at", "id"),
+        Index("ix_incidents_space_id_status_created_at_id", "space_id", "status", "created_at", "id"),
+        # Один відкритий інцидент на правило пристрою; повторні спрацювання об'єднуються
+        # через INSERT ... ON CONFLICT за цим індексом (app.core.event_processor)
+        Index(
+            "ix_incidents_open_device_id_rule", "device_id", "rule", unique=True,
+            postgresql_where=status.in_(OPEN_STATUSES)
+        ),
+    )
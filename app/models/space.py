@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, Enum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -21,7 +21,13 @@ class Space(Base):
     name = Column(String, nullable=False)
     type = Column(Enum(SpaceType), default=SpaceType.HOME)
     address = Column(String)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    # Лічильники, які підтримують операції з пристроями та хабами (app.core.counters)
+    device_count = Column(Integer, nullable=False, default=0, server_default="0")
+    hub_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Маркер версії даних простору для умовних GET-запитів (app.core.versions)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    modified_at = Column(DateTime(timezone=True), server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Enum
+
+from app.database import Base
+import enum
+
+
+class TelemetryBucket(enum.Enum):
+    MINUTE = "1m"
+    HOUR = "1h"
+    DAY = "1d"
+
+
+class TelemetryRollup(Base):
+    """
+    Агрегати показника пристрою за інтервал часу (хвилина, година, доба).
+    Середнє значення обчислюється як sum / count, тому агрегати можна доповнювати інкрементально.
+    """
+    __tablename__ = "telemetry_rollups"
+
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    metric = Column(String, primary_key=True)
+    bucket = Column(Enum(TelemetryBucket), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
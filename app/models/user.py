@@ -15,6 +15,8 @@ class User(Base):
     last_name = Column(String)
     phone = Column(String)
     is_active = Column(Boolean, default=True)
+    # Збільшується при деактивації, щоб раніше видані токени перестали діяти
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -3,5 +3,8 @@ from app.schemas.auth import Token, TokenData
 from app.schemas.space import SpaceBase, SpaceCreate, SpaceUpdate, SpaceInDB, SpaceOut
 from app.schemas.hub import HubBase, HubCreate, HubUpdate, HubInDB, HubOut
 from app.schemas.device import DeviceBase, DeviceCreate, DeviceUpdate, DeviceInDB, DeviceOut, DeviceWithEventsOut
-from app.schemas.event import EventBase, EventCreate, EventInDB, EventOut
+from app.schemas.event import EventBase, EventCreate, EventInDB, EventOut, EventBatchItemResult
 from app.schemas.incident import IncidentBase, IncidentStatusUpdate, IncidentInDB, IncidentOut, IncidentWithEventOut
+from app.schemas.telemetry import TelemetryPoint
+from app.schemas.device_state import DeviceStateOut
+from app.schemas.summary import HubStatusOut, SpaceSummary
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Optional
 
 
 class Token(BaseModel):
@@ -8,3 +9,5 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     user_id: int
+    token_version: Optional[int] = None
+    is_active: Optional[bool] = None
@@ -1,13 +1,43 @@
-from pydantic import BaseModel, Field
+import math
+
+from pydantic import BaseModel, Field, validator
 from typing import Optional, Dict, Any, List, TYPE_CHECKING
 from datetime import datetime
 
 from app.models.device import DeviceType
+from app.core.incident_rules import DEFAULT_THRESHOLDS
 
 if TYPE_CHECKING:
     from app.schemas.event import EventOut
 
 
+def validate_config(config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Перевіряє пороги правил інцидентів у конфігурації пристрою (див. app.core.incident_rules).
+    Інші ключі конфігурації не перевіряються.
+    """
+    if not config:
+        return config
+
+    for key in DEFAULT_THRESHOLDS:
+        if key not in config:
+            continue
+        value = config[key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{key} must be a finite number")
+
+    for low, high in (("min_temperature", "max_temperature"), ("min_humidity", "max_humidity")):
+        if low in config and high in config and config[low] >= config[high]:
+            raise ValueError(f"{low} must be less than {high}")
+
+    if "debounce_hits" in config:
+        value = config["debounce_hits"]
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError("debounce_hits must be a positive integer")
+
+    return config
+
+
 class DeviceBase(BaseModel):
     name: str
     type: DeviceType
@@ -19,6 +49,10 @@ class DeviceBase(BaseModel):
 class DeviceCreate(DeviceBase):
     hub_id: Optional[int] = None
 
+    @validator('config')
+    def validate_config(cls, v):
+        return validate_config(v)
+
 
 class DeviceUpdate(BaseModel):
     name: Optional[str] = None
@@ -27,6 +61,10 @@ class DeviceUpdate(BaseModel):
     hub_id: Optional[int] = None
     config: Optional[Dict[str, Any]] = None
 
+    @validator('config')
+    def validate_config(cls, v):
+        return validate_config(v)
+
 
 class DeviceInDB(DeviceBase):
     id: int
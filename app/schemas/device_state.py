@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+from app.models.device import DeviceType
+from app.models.event import EventType
+
+
+class DeviceStateOut(BaseModel):
+    device_id: int
+    name: str
+    type: DeviceType
+    location: Optional[str] = None
+    is_active: bool
+    battery_level: Optional[float] = None
+    last_seen: Optional[datetime] = None
+    last_event_type: Optional[EventType] = None
+    last_event_at: Optional[datetime] = None
+    # None, якщо пристрій ще не надсилав подій
+    readings: Optional[Dict[str, Any]] = None
+    open_incident_count: int = 0
+
+    class Config:
+        orm_mode = True
@@ -1,10 +1,49 @@
-from pydantic import BaseModel, validator
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field, ValidationError, validator
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 
 from app.models.event import EventType
 
 
+# NaN та Infinity не можна порівнювати з порогами і зберігати в агрегатах, тому вони відхиляються
+class TemperaturePayload(BaseModel):
+    temperature: Optional[float] = Field(None, allow_inf_nan=False)
+    unit: str = "°C"
+
+
+class HumidityPayload(BaseModel):
+    humidity: Optional[float] = Field(None, allow_inf_nan=False)
+    unit: str = "%"
+
+
+class BatteryPayload(BaseModel):
+    battery: Optional[float] = Field(None, ge=0, le=100, allow_inf_nan=False)
+    unit: str = "%"
+
+
+# Схеми даних для подій з числовим показником і назва поля з основним значенням
+EVENT_PAYLOADS = {
+    EventType.TEMPERATURE: (TemperaturePayload, "temperature"),
+    EventType.HUMIDITY: (HumidityPayload, "humidity"),
+    EventType.BATTERY: (BatteryPayload, "battery"),
+}
+
+
+def extract_value(event_type: EventType, data: Optional[Dict[str, Any]]) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Повертає основне числове значення події та його одиницю виміру для збереження
+    в колонках Event.value і Event.unit, або (None, None) для подій без показника.
+    """
+    if event_type not in EVENT_PAYLOADS or not data:
+        return None, None
+    schema, field = EVENT_PAYLOADS[event_type]
+    payload = schema.model_validate(data)
+    value = getattr(payload, field)
+    if value is None:
+        return None, None
+    return value, payload.unit
+
+
 class EventBase(BaseModel):
     type: EventType
     data: Optional[Dict[str, Any]] = None
@@ -21,10 +60,29 @@ class EventCreate(EventBase):
             raise ValueError('Either device_id or zigbee_id must be provided')
         return v
 
+    @validator('data')
+    def validate_payload(cls, v, values, **kwargs):
+        # Показник має бути числом, щоб його можна було зберегти в Event.value
+        event_type = values.get('type')
+        if v and event_type in EVENT_PAYLOADS:
+            try:
+                extract_value(event_type, v)
+            except ValidationError as exc:
+                raise ValueError(f"Invalid {event_type.value} payload: {exc.errors()[0]['msg']}")
+        # Заряд батареї з будь-якої події оновлює Device.battery_level, тому перевіряється завжди
+        if v and v.get('battery') is not None and event_type != EventType.BATTERY:
+            try:
+                BatteryPayload.model_validate({"battery": v['battery']})
+            except ValidationError as exc:
+                raise ValueError(f"Invalid battery level: {exc.errors()[0]['msg']}")
+        return v
+
 
 class EventInDB(EventBase):
     id: int
     device_id: int
+    value: Optional[float] = None
+    unit: Optional[str] = None
     processed: bool
     created_at: datetime
 
@@ -34,3 +92,10 @@ class EventInDB(EventBase):
 
 class EventOut(EventInDB):
     pass
+
+
+class EventBatchItemResult(BaseModel):
+    index: int
+    event_id: Optional[int] = None
+    device_id: Optional[int] = None
+    error: Optional[str] = None
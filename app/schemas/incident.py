@@ -21,6 +21,11 @@ class IncidentInDB(IncidentBase):
     id: int
     status: IncidentStatus
     event_id: int
+    device_id: Optional[int] = None
+    space_id: Optional[int] = None
+    rule: Optional[str] = None
+    hit_count: int = 1
+    last_seen_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     resolved_at: Optional[datetime] = None
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, List
+from datetime import datetime
+
+from app.models.incident import IncidentSeverity
+from app.schemas.space import SpaceOut
+from app.schemas.device import DeviceOut
+from app.schemas.incident import IncidentOut
+
+
+class HubStatusOut(BaseModel):
+    id: int
+    name: str
+    model: Optional[str] = None
+    is_active: bool
+    online: bool
+    last_connection: Optional[datetime] = None
+    device_count: int = 0
+
+
+class SpaceSummary(BaseModel):
+    space: SpaceOut
+    hubs: List[HubStatusOut]
+    devices: List[DeviceOut]
+    open_incidents: Dict[IncidentSeverity, int]
+    latest_incidents: List[IncidentOut]
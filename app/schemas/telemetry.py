@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class TelemetryPoint(BaseModel):
+    bucket_start: datetime
+    count: int
+    avg: float
+    min: float
+    max: float
+
+    class Config:
+        orm_mode = True
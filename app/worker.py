@@ -0,0 +1,71 @@
+import argparse
+import logging
+import signal
+import time
+
+from app.config import settings
+from app.core.event_processor import process_pending_events
+from app.core.notification_dispatcher import notification_dispatcher
+from app.core.broker import stream_broker
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+
+class EventWorker:
+    """
+    Окремий процес обробки подій.
+    Забирає необроблені події з таблиці events пакетами, тож після перезапуску
+    автоматично дообробляє все, що накопичилося. Для масштабування достатньо
+    запустити кілька процесів на одному або кількох вузлах.
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stopping = False
+
+    def stop(self, *args):
+        logger.info("Stopping event worker")
+        self.stopping = True
+
+    def run(self):
+        logger.info(f"Event worker started, batch size: {self.batch_size}")
+        while not self.stopping:
+            try:
+                processed = process_pending_events(self.batch_size)
+            except Exception:
+                logger.exception("Failed to process events batch")
+                processed = 0
+
+            # Якщо черга порожня, чекаємо перед наступною спробою
+            if processed < self.batch_size and not self.stopping:
+                time.sleep(self.poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Safe Space event processing worker")
+    parser.add_argument("--batch-size", type=int, default=settings.WORKER_BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=settings.WORKER_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    worker = EventWorker(batch_size=args.batch_size, poll_interval=args.poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    notification_dispatcher.start()
+    try:
+        worker.run()
+    finally:
+        notification_dispatcher.stop()
+        stream_broker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Порівняння пропускної здатності обробки подій: по одній події (process_event)
+і пакетами (process_events).
+
+Скрипт створює окремого користувача, простір, хаб і пристрої, записує події
+і вимірює кількість проаналізованих подій за секунду в кожному режимі.
+Дані не видаляються, тому скрипт запускається лише з явно заданим DATABASE_URL
+окремої бази даних (її схему має бути оновлено міграціями):
+
+    DATABASE_URL=postgresql://.../safe_space_bench python -m scripts.benchmark_event_processing --events 2000
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+from typing import List
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.device import Device, DeviceType
+from app.models.event import EventType
+from app.models.hub import Hub
+from app.models.space import Space
+from app.models.user import User
+from app.core.event_processor import process_event, process_events
+from app.core.event_writer import event_row, write_events
+
+
+def create_devices(count: int) -> List[Device]:
+    tag = uuid.uuid4().hex[:12]
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        user = User(email=f"benchmark-{tag}@example.com", hashed_password="-")
+        db.add(user)
+        db.flush()
+        space = Space(name=f"Benchmark {tag}", owner_id=user.id)
+        db.add(space)
+        db.flush()
+        hub = Hub(name=f"Benchmark {tag}", api_key=f"benchmark-{tag}", space_id=space.id)
+        db.add(hub)
+        db.flush()
+        devices = [
+            Device(
+                name=f"Sensor {index}", type=DeviceType.TEMPERATURE_SENSOR, zigbee_id=f"benchmark-{tag}-{index}",
+                hub_id=hub.id, space_id=space.id
+            )
+            for index in range(count)
+        ]
+        db.add_all(devices)
+        db.commit()
+        return devices
+    finally:
+        db.close()
+
+
+def create_events(devices: List[Device], count: int) -> List[int]:
+    # Приблизно кожна п'ята подія перевищує поріг і відкриває або доповнює інцидент
+    rows = []
+    for index in range(count):
+        device = devices[index % len(devices)]
+        temperature = random.choice([21.5, 22.0, 23.5, 24.0, 40.0])
+        rows.append(event_row(EventType.TEMPERATURE, {"temperature": temperature}, device.id, device.space_id))
+
+    db = SessionLocal()
+    try:
+        return [event.id for event in write_events(db, rows)]
+    finally:
+        db.close()
+
+
+def measure(label: str, event_ids: List[int], run) -> float:
+    started = time.perf_counter()
+    run(event_ids)
+    elapsed = time.perf_counter() - started
+    rate = len(event_ids) / elapsed
+    print(f"{label:<10} {len(event_ids)} events in {elapsed:.2f}s - {rate:.0f} events/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-event and batched event processing")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=settings.WORKER_BATCH_SIZE)
+    args = parser.parse_args()
+    if not os.getenv("DATABASE_URL"):
+        parser.error("set DATABASE_URL to a separate benchmark database, the benchmark data is not deleted")
+
+    # Для кожного режиму окремі пристрої, щоб кеш правил пристроїв не прогрівався заздалегідь,
+    # а інциденти, відкриті першим прогоном, не перетворювали вставки другого на оновлення
+    single_ids = create_events(create_devices(args.devices), args.events)
+    batch_ids = create_events(create_devices(args.devices), args.events)
+
+    def run_single(event_ids):
+        for event_id in event_ids:
+            process_event(event_id)
+
+    def run_batched(event_ids):
+        for start in range(0, len(event_ids), args.batch_size):
+            process_events(event_ids[start:start + args.batch_size])
+
+    single_rate = measure("per-event", single_ids, run_single)
+    batch_rate = measure("batched", batch_ids, run_batched)
+    print(f"speedup: {batch_rate / single_rate:.1f}x (batch size {args.batch_size})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Тести, яким потрібен PostgreSQL (плани запитів, секціонована таблиця events), запускаються
+# лише з TEST_DATABASE_URL, що вказує на окрему тестову базу даних: її схему оновлюють міграції,
+# а тестові дані в ній не видаляються. URL підставляється до імпорту app.config
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    if TEST_DATABASE_URL.startswith("postgresql://"):
+        os.environ["ASYNC_DATABASE_URL"] = TEST_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    if not TEST_DATABASE_URL or not TEST_DATABASE_URL.startswith("postgresql"):
+        pytest.skip("TEST_DATABASE_URL is not set to a PostgreSQL database")
+
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy.engine import make_url
+
+    from app.database import engine
+
+    # Міграції і тестові дані не повинні потрапити в робочу базу даних, якщо налаштування
+    # застосунку не підхопили TEST_DATABASE_URL (наприклад, app.config імпортовано раніше)
+    expected = make_url(TEST_DATABASE_URL).render_as_string(hide_password=False)
+    if engine.url.render_as_string(hide_password=False) != expected:
+        pytest.exit(f"Application engine points at {engine.url!r}, not at TEST_DATABASE_URL", returncode=1)
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+
+    return engine
+
+
+@pytest.fixture
+def session_factory():
+    """
+    Фабрика сесій SQLite у пам'яті з таблицями користувачів, просторів, хабів і пристроїв -
+    для тестів кількості запитів, яким не потрібен PostgreSQL.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.database import Base
+    from app.models.device import Device
+    from app.models.hub import Hub
+    from app.models.space import Space
+    from app.models.user import User
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[User.__table__, Space.__table__, Hub.__table__, Device.__table__])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,70 @@
+"""
+Кількість SQL-запитів списку хабів не залежить від розміру сторінки (немає N+1).
+"""
+import pytest
+from sqlalchemy import event
+
+from app.config import settings
+from app.models.device import Device, DeviceType
+from app.models.hub import Hub
+from app.models.space import Space
+from app.models.user import User
+from app.schemas.hub import HubOut
+from app.api.hubs import read_hubs
+
+DEVICES_PER_HUB = 3
+
+
+def seed_space(session_factory, hub_count: int) -> int:
+    with session_factory() as db:
+        user = User(email=f"hubs-{hub_count}@example.com", hashed_password="-")
+        db.add(user)
+        db.flush()
+        space = Space(name="Space", owner_id=user.id, hub_count=hub_count, device_count=hub_count * DEVICES_PER_HUB)
+        db.add(space)
+        db.flush()
+        for index in range(hub_count):
+            hub = Hub(name=f"Hub {index}", api_key=f"key-{hub_count}-{index}", space_id=space.id,
+                      device_count=DEVICES_PER_HUB)
+            db.add(hub)
+            db.flush()
+            db.add_all(
+                Device(name=f"Device {number}", type=DeviceType.MOTION_SENSOR, hub_id=hub.id, space_id=space.id)
+                for number in range(DEVICES_PER_HUB)
+            )
+        db.commit()
+        return space.id
+
+
+def read_hub_page(session_factory, space_id: int):
+    """
+    Повертає серіалізовану сторінку хабів і SQL-запити, виконані для неї (включно з серіалізацією).
+    """
+    statements = []
+    with session_factory() as db:
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db.get_bind()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            hubs = read_hubs(space_id, db=db, current_user=None)
+            page = [HubOut.model_validate(hub, from_attributes=True) for hub in hubs]
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return page, statements
+
+
+@pytest.mark.parametrize("counter_cache", [True, False])
+def test_read_hubs_statement_count_is_constant(session_factory, monkeypatch, counter_cache):
+    monkeypatch.setattr(settings, "COUNTER_CACHE_ENABLED", counter_cache)
+    single_space = seed_space(session_factory, 1)
+    many_space = seed_space(session_factory, 20)
+
+    single_page, single_statements = read_hub_page(session_factory, single_space)
+    many_page, many_statements = read_hub_page(session_factory, many_space)
+
+    assert len(single_page) == 1
+    assert len(many_page) == 20
+    assert all(hub.device_count == DEVICES_PER_HUB for hub in single_page + many_page)
+    assert len(single_statements) == len(many_statements)
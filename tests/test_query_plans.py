@@ -0,0 +1,163 @@
+"""
+Плани запитів списків: на наповненій базі кожен список має читати свою таблицю
+через індекс, а не послідовним скануванням. Потрібен PostgreSQL (TEST_DATABASE_URL).
+"""
+import uuid
+
+import pytest
+from sqlalchemy import event, text
+
+from app.core.pagination import NEXT_CURSOR_HEADER
+
+# Bitmap Heap Scan читає таблицю за бітовою картою, побудованою дочірнім Bitmap Index Scan
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+# Фонові дані інших користувачів, щоб вибірки списків були селективними
+NOISE_SPACES = 2000
+HUBS_PER_SPACE = 2
+DEVICES_PER_SPACE = 10
+NOISE_EVENTS = 200000
+NOISE_INCIDENTS = 20000
+
+
+def seed_noise(engine):
+    with engine.begin() as conn:
+        owner_id = conn.execute(text(
+            "INSERT INTO users (email, hashed_password, is_active, token_version) "
+            "VALUES (:email, '-', true, 0) RETURNING id"
+        ), {"email": f"noise-{uuid.uuid4().hex}@example.com"}).scalar_one()
+        conn.execute(text(
+            "INSERT INTO spaces (name, owner_id) SELECT 'Noise ' || g, :owner_id FROM generate_series(1, :count) g"
+        ), {"owner_id": owner_id, "count": NOISE_SPACES})
+        conn.execute(text(
+            "INSERT INTO hubs (name, api_key, is_active, space_id) "
+            "SELECT 'Hub ' || g, md5(random()::text || clock_timestamp()::text), true, s.id "
+            "FROM spaces s, generate_series(1, :count) g WHERE s.owner_id = :owner_id"
+        ), {"owner_id": owner_id, "count": HUBS_PER_SPACE})
+        conn.execute(text(
+            "INSERT INTO devices (name, type, is_active, hub_id, space_id) "
+            "SELECT 'Sensor ' || g, 'TEMPERATURE_SENSOR', true, "
+            "(SELECT min(h.id) FROM hubs h WHERE h.space_id = s.id), s.id "
+            "FROM spaces s, generate_series(1, :count) g WHERE s.owner_id = :owner_id"
+        ), {"owner_id": owner_id, "count": DEVICES_PER_SPACE})
+        device_ids = conn.execute(text(
+            "SELECT d.id FROM devices d JOIN spaces s ON s.id = d.space_id WHERE s.owner_id = :owner_id"
+        ), {"owner_id": owner_id}).scalars().all()
+        conn.execute(text(
+            "INSERT INTO events (type, data, value, unit, processed, device_id, space_id, created_at) "
+            "SELECT 'TEMPERATURE', '{}', 21.5, '°C', true, d.id, d.space_id, now() - g * interval '1 second' "
+            "FROM generate_series(1, :count) g "
+            "JOIN devices d ON d.id = (:devices)[1 + g % cardinality(:devices)]"
+        ), {"count": NOISE_EVENTS, "devices": device_ids})
+        conn.execute(text(
+            "INSERT INTO incidents (title, status, severity, device_id, space_id, rule, hit_count, created_at) "
+            "SELECT 'Noise', 'RESOLVED', 'LOW', d.id, d.space_id, 'high_temperature', 1, "
+            "now() - g * interval '1 second' "
+            "FROM generate_series(1, :count) g "
+            "JOIN devices d ON d.id = (:devices)[1 + g % cardinality(:devices)]"
+        ), {"count": NOISE_INCIDENTS, "devices": device_ids})
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("ANALYZE")
+
+
+@pytest.fixture(scope="module")
+def dataset(pg_engine, client):
+    seed_noise(pg_engine)
+
+    email = f"plans-{uuid.uuid4().hex}@example.com"
+    client.post("/api/users/", json={"email": email, "password": "secret", "phone": "1"})
+    token = client.post("/api/token", data={"username": email, "password": "secret"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    space = client.post("/api/spaces/", json={"name": "Plans"}, headers=headers).json()
+    hub = client.post(f"/api/spaces/{space['id']}/hubs", json={"name": "Hub"}, headers=headers).json()
+    device = client.post(
+        "/api/spaces/hub/devices", json={"name": "Sensor", "type": "temperature_sensor"},
+        headers={"X-API-Key": hub["api_key"]}
+    ).json()
+
+    with pg_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO events (type, data, value, unit, processed, device_id, space_id, created_at) "
+            "SELECT 'TEMPERATURE', '{}', 21.5, '°C', true, :device_id, :space_id, now() - g * interval '1 second' "
+            "FROM generate_series(1, 500) g"
+        ), {"device_id": device["id"], "space_id": space["id"]})
+        conn.execute(text(
+            "INSERT INTO incidents (title, status, severity, device_id, space_id, rule, hit_count, created_at) "
+            "SELECT 'Plans', 'RESOLVED', 'LOW', :device_id, :space_id, 'high_temperature', 1, "
+            "now() - g * interval '1 second' FROM generate_series(1, 200) g"
+        ), {"device_id": device["id"], "space_id": space["id"]})
+
+    return {"headers": headers, "space_id": space["id"], "device_id": device["id"]}
+
+
+def capture_statements(engine, client, url, headers):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 200, response.text
+    return response, statements
+
+
+def plan_scans(engine, statement, parameters):
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar_one()
+
+    scans = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Relation Name" in node:
+            scans.append((node["Relation Name"], node["Node Type"]))
+        nodes.extend(node.get("Plans", ()))
+    return scans
+
+
+def assert_index_scans(engine, client, url, headers, table):
+    response, statements = capture_statements(engine, client, url, headers)
+
+    # Секції events мають назви events_<...>
+    scans = [
+        (relation, node_type)
+        for statement, parameters in statements
+        for relation, node_type in plan_scans(engine, statement, parameters)
+        if relation == table or relation.startswith(f"{table}_")
+    ]
+    assert scans, f"{url} did not read {table}"
+    assert all(node_type in INDEX_SCANS for _, node_type in scans), f"{url}: {scans}"
+    return response
+
+
+@pytest.mark.parametrize("path, table", [
+    ("/api/spaces/", "spaces"),
+    ("/api/spaces/{space_id}/hubs", "hubs"),
+    ("/api/spaces/{space_id}/devices", "devices"),
+    ("/api/spaces/{space_id}/events", "events"),
+    ("/api/spaces/{space_id}/events?event_type=temperature&device_id={device_id}", "events"),
+    ("/api/spaces/devices/{device_id}/events", "events"),
+    ("/api/spaces/devices/{device_id}/events?event_type=temperature", "events"),
+    ("/api/spaces/{space_id}/incidents", "incidents"),
+    ("/api/spaces/{space_id}/incidents?status=resolved", "incidents"),
+])
+def test_list_endpoints_use_index_scans(pg_engine, client, dataset, path, table):
+    url = path.format(space_id=dataset["space_id"], device_id=dataset["device_id"])
+    assert_index_scans(pg_engine, client, url, dataset["headers"], table)
+
+
+@pytest.mark.parametrize("path, table", [
+    ("/api/spaces/{space_id}/events", "events"),
+    ("/api/spaces/devices/{device_id}/events", "events"),
+    ("/api/spaces/{space_id}/incidents", "incidents"),
+])
+def test_cursor_pages_use_index_scans(pg_engine, client, dataset, path, table):
+    url = path.format(space_id=dataset["space_id"], device_id=dataset["device_id"])
+    first_page = client.get(url, headers=dataset["headers"])
+    cursor = first_page.headers[NEXT_CURSOR_HEADER]
+    assert_index_scans(pg_engine, client, f"{url}?after={cursor}", dataset["headers"], table)
@@ -0,0 +1,104 @@
+"""
+Кількість SQL-запитів списку просторів і окремого простору не залежить від кількості
+просторів, хабів і пристроїв (немає N+1 при підрахунку device_count і hub_count).
+"""
+import pytest
+from sqlalchemy import event
+
+from app.config import settings
+from app.models.device import Device, DeviceType
+from app.models.hub import Hub
+from app.models.space import Space
+from app.models.user import User
+from app.schemas.space import SpaceOut
+from app.api.deps import UserIdentity
+from app.api.spaces import read_space, read_spaces
+
+HUBS_PER_SPACE = 2
+DEVICES_PER_HUB = 3
+
+
+def seed_user(session_factory, space_count: int) -> UserIdentity:
+    with session_factory() as db:
+        user = User(email=f"spaces-{space_count}@example.com", hashed_password="-")
+        db.add(user)
+        db.flush()
+        for index in range(space_count):
+            space = Space(name=f"Space {index}", owner_id=user.id, hub_count=HUBS_PER_SPACE,
+                          device_count=HUBS_PER_SPACE * DEVICES_PER_HUB)
+            db.add(space)
+            db.flush()
+            for number in range(HUBS_PER_SPACE):
+                hub = Hub(name=f"Hub {number}", api_key=f"key-{space_count}-{index}-{number}", space_id=space.id,
+                          device_count=DEVICES_PER_HUB)
+                db.add(hub)
+                db.flush()
+                db.add_all(
+                    Device(name=f"Device {device}", type=DeviceType.MOTION_SENSOR, hub_id=hub.id, space_id=space.id)
+                    for device in range(DEVICES_PER_HUB)
+                )
+        db.commit()
+        return UserIdentity(id=user.id, is_active=True, token_version=0)
+
+
+def capture_statements(session_factory, read):
+    """
+    Повертає серіалізований результат read(db) і SQL-запити, виконані для нього (включно з серіалізацією).
+    """
+    statements = []
+    with session_factory() as db:
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db.get_bind()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            result = read(db)
+            if isinstance(result, list):
+                result = [SpaceOut.model_validate(space, from_attributes=True) for space in result]
+            else:
+                result = SpaceOut.model_validate(result, from_attributes=True)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+
+def assert_counts(space: SpaceOut):
+    assert space.hub_count == HUBS_PER_SPACE
+    assert space.device_count == HUBS_PER_SPACE * DEVICES_PER_HUB
+
+
+@pytest.mark.parametrize("counter_cache", [True, False])
+def test_read_spaces_statement_count_is_constant(session_factory, monkeypatch, counter_cache):
+    monkeypatch.setattr(settings, "COUNTER_CACHE_ENABLED", counter_cache)
+    single_user = seed_user(session_factory, 1)
+    many_user = seed_user(session_factory, 30)
+
+    single_page, single_statements = capture_statements(
+        session_factory, lambda db: read_spaces(db=db, current_user=single_user)
+    )
+    many_page, many_statements = capture_statements(
+        session_factory, lambda db: read_spaces(db=db, current_user=many_user)
+    )
+
+    assert len(single_page) == 1
+    assert len(many_page) == 30
+    for space in single_page + many_page:
+        assert_counts(space)
+    assert len(single_statements) == len(many_statements)
+    # Сторінка просторів, а при вимкненому кеші лічильників - ще один запит з підрахунком
+    assert len(many_statements) == (1 if counter_cache else 2)
+
+
+@pytest.mark.parametrize("counter_cache", [True, False])
+def test_read_space_statement_count(session_factory, monkeypatch, counter_cache):
+    monkeypatch.setattr(settings, "COUNTER_CACHE_ENABLED", counter_cache)
+    user = seed_user(session_factory, 3)
+    with session_factory() as db:
+        space_id = db.query(Space.id).filter(Space.owner_id == user.id).order_by(Space.id).first()[0]
+
+    space, statements = capture_statements(session_factory, lambda db: read_space(space_id, db=db, current_user=user))
+
+    assert space.id == space_id
+    assert_counts(space)
+    assert len(statements) == (1 if counter_cache else 2)